@@ -1,15 +1,51 @@
-import requests
-import pandas as pd
+import asyncio
+
+# NumPy stays a startup import on purpose: module-level tables (climatology._MONTH_OFFSETS,
+# the compiled scoring.scorer matrices) need it, and every request path uses it anyway
 import numpy as np
 from datetime import datetime
 import json
+import logging
+import time
+
+from app import metrics, utils
+from app.cache import ClimatologyCache, LRUCache
+from app.climatology import ClimatologyIndex, day_slot, round_stat
+from app.parser import parse_power_parameter
+from app.scoring import FEATURES, scorer
+from app.spatial import cell_center, idw_weights, interpolate_stats, snap_to_grid
+from app.storage import PowerSeries
+
+logger = logging.getLogger(__name__)
+
+
 def f_to_c(fahrenheit: float) -> float:
     return (fahrenheit - 32) * 5.0 / 9.0
 
+_UNITS = {'celsius': '°C', 'prob': '%', 'mm': 'mm', 'g_kg': 'g/kg', 'ms': 'm/s', 'mph': 'mph', 'kpa': 'kPa', 'mb': 'mb'}
+
+
+def _unit(field):
+    for suffix, unit in _UNITS.items():
+        if field.endswith(f"_{suffix}"):
+            return unit
+    return ''
+
 class NASAWeatherAnalyzer:
-    def __init__(self):
-        self.base_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
-        self.current_year = datetime.now().year
+    def __init__(self, cache=None):
+        self.base_url = utils.POWER_BASE_URL
+        self.cache = cache if cache is not None else ClimatologyCache()
+        self._http_client = None
+        self._downloads = None  # (event loop, semaphore) bounding POWER requests in flight
+        self._inflight = {}  # (cell, start_year, end_year) -> download task
+        # (cell, start_year, end_year) -> ClimatologyIndex, about 0.45 MB each (more once windowed stats are used)
+        self.indexes = LRUCache(utils.INDEX_MEMORY_ENTRIES, int(utils.INDEX_MEMORY_MB * 1024 * 1024))
+        self._background = set()  # prefetch tasks, referenced until they finish
+
+    @property
+    def current_year(self):
+        # Read on every call so long-running workers roll over at New Year
+        return datetime.now().year
 
     def export_to_json(self, latitude, longitude, future_date, stats):
         if isinstance(future_date, str):
@@ -27,32 +63,33 @@ class NASAWeatherAnalyzer:
         return output
 
     def export_to_csv(self, latitude, longitude, future_date, stats):
+        import csv
         import io
+        from app.export import flatten_stats
         rows = []
         rows.append(['Metric', 'Value', 'Unit'])
         rows.append(['Latitude', latitude, 'degrees'])
         rows.append(['Longitude', longitude, 'degrees'])
         rows.append(['Target Date', future_date, ''])
         rows.append(['Sample Size', stats['sample_size'], 'observations'])
-        df = pd.DataFrame(rows)
+        for field, value in flatten_stats(stats):
+            if field != 'sample_size':
+                rows.append([field, '' if value is None else value, _unit(field)])
         buffer = io.StringIO()
-        df.to_csv(buffer, index=False, header=False)
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
         return buffer.getvalue()
 
-    def fetch_historical_data(self, latitude, longitude, start_year=None, end_year=None):
-        """
-        Fetch historical weather data from NASA POWER API
-
-        Parameters:
-        - latitude: float (-90 to 90)
-        - longitude: float (-180 to 180)
-        - start_year: int (default: current_year - 10)
-        - end_year: int (default: current_year - 1)
-        """
+    def default_years(self, start_year=None, end_year=None):
+        """The year range analyses use, the last 10 full years unless given"""
         if start_year is None:
             start_year = self.current_year - 10
         if end_year is None:
             end_year = self.current_year - 1
+        return start_year, end_year
+
+    def _request_params(self, latitude, longitude, start_year, end_year):
+        # Every point in a cell returns the same series, so ask for the cell center
+        cell_lat, cell_lon = cell_center(*snap_to_grid(latitude, longitude))
 
         # Parameters we want to fetch
         parameters = [
@@ -63,42 +100,196 @@ class NASAWeatherAnalyzer:
             'PRECTOTCORR'  # Precipitation (mm/day)
         ]
 
-        params = {
+        return {
             'parameters': ','.join(parameters),
             'community': 'AG',  # Agroclimatology community
-            'longitude': longitude,
-            'latitude': latitude,
+            'longitude': cell_lon,
+            'latitude': cell_lat,
             'start': f"{start_year}0101",
             'end': f"{end_year}1231",
             'format': 'JSON'
         }
 
-        print(f"Fetching data from NASA POWER API...")
-        print(f"Location: ({latitude}, {longitude})")
-        print(f"Period: {start_year} - {end_year}")
+    @staticmethod
+    def _extract_parameter(data):
+        if 'properties' in data and 'parameter' in data['properties']:
+            return data['properties']['parameter']
+        raise Exception("Unexpected API response format")
 
-        try:
-            response = requests.get(self.base_url, params=params, timeout=60)
-            response.raise_for_status()
-            data = response.json()
+    def fetch_historical_data(self, latitude, longitude, start_year=None, end_year=None):
+        """
+        Fetch historical weather data from NASA POWER API
+
+        Parameters:
+        - latitude: float (-90 to 90)
+        - longitude: float (-180 to 180)
+        - start_year: int (default: current_year - 10)
+        - end_year: int (default: current_year - 1)
+
+        Returns a PowerSeries. Results are cached per POWER grid cell, so
+        nearby coordinates share one download. When the cell already holds
+        an older range, only the missing years are downloaded.
+        """
+        start_year, end_year = self.default_years(start_year, end_year)
+
+        cached = self.cache.get(latitude, longitude, start_year, end_year)
+        if cached is not None:
+            return cached
 
-            if 'properties' in data and 'parameter' in data['properties']:
-                return data['properties']['parameter']
-            else:
-                raise Exception("Unexpected API response format")
+        fetch_start, base = self._plan_refresh(self.cache.get_cell(latitude, longitude), start_year, end_year)
+        if fetch_start > end_year:
+            return base
 
+        params = self._request_params(latitude, longitude, fetch_start, end_year)
+
+        logger.debug("Fetching NASA POWER data for (%s, %s), %s-%s", latitude, longitude, fetch_start, end_year)
+
+        import requests  # blocking path only; not loaded at startup
+
+        try:
+            with metrics.upstream("power", "power_fetch"):
+                response = requests.get(self.base_url, params=params, timeout=utils.POWER_TIMEOUT)
+                response.raise_for_status()
         except requests.exceptions.RequestException as e:
             raise Exception(f"Error fetching data from NASA API: {e}")
 
+        return self.store_response(latitude, longitude, fetch_start, end_year, response.content, base)
+
+    @staticmethod
+    def _plan_refresh(stored, start_year, end_year):
+        """
+        Work out what to download for start_year..end_year given the series
+        already stored for the cell.
+
+        Returns (fetch_start, base): download fetch_start..end_year and append
+        it to base, the reusable part of the stored series (None means a full
+        download). fetch_start > end_year means base already covers the range.
+        """
+        if stored is None or not stored.start_year <= start_year <= stored.end_year:
+            return start_year, None
+
+        keep_end = min(stored.end_year, end_year)
+        if keep_end == stored.end_year and stored.has_trailing_gap():
+            # POWER lags by a few weeks, so the newest stored year may be incomplete
+            keep_end -= 1
+        if keep_end < start_year:
+            return start_year, None
+        return keep_end + 1, stored.slice_years(start_year, keep_end)
+
+    def _get_http_client(self):
+        if self._http_client is None or self._http_client.is_closed:
+            import httpx  # only needed on a cache miss; not loaded at startup
+
+            self._http_client = httpx.AsyncClient(
+                timeout=utils.POWER_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=utils.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=utils.HTTP_MAX_KEEPALIVE,
+                ),
+            )
+        return self._http_client
+
+    async def aclose(self):
+        """Close the pooled HTTP client used by the async fetch path"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def fetch_historical_data_async(self, latitude, longitude, start_year=None, end_year=None):
+        """
+        Async variant of fetch_historical_data.
+
+        Uses a shared pooled HTTP client, and concurrent calls for the same
+        grid cell and year range wait on a single in-flight download.
+        """
+        start_year, end_year = self.default_years(start_year, end_year)
+
+        with metrics.span("cache_read"):
+            cached = await asyncio.to_thread(self.cache.get, latitude, longitude, start_year, end_year)
+        metrics.cache_lookup("power", cached is not None)
+        if cached is not None:
+            return cached
+
+        key = (self.cache.key(latitude, longitude), start_year, end_year)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._download_async(latitude, longitude, start_year, end_year))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled caller does not abort the download for the others
+        return await asyncio.shield(task)
+
+    def _download_slots(self):
+        # asyncio primitives belong to one event loop (a new one per asyncio.run or test client)
+        loop = asyncio.get_running_loop()
+        if self._downloads is None or self._downloads[0] is not loop:
+            self._downloads = (loop, asyncio.Semaphore(utils.POWER_MAX_CONCURRENCY))
+        return self._downloads[1]
+
+    async def download_raw_async(self, latitude, longitude, start_year, end_year):
+        """
+        Download the POWER JSON response body for a cell, without parsing or caching it.
+
+        At most POWER_MAX_CONCURRENCY downloads run at once; the others wait
+        here rather than in the connection pool, where they would time out.
+        """
+        import httpx
+
+        params = self._request_params(latitude, longitude, start_year, end_year)
+
+        logger.debug("Fetching NASA POWER data for (%s, %s), %s-%s", latitude, longitude, start_year, end_year)
+
+        try:
+            async with self._download_slots():
+                with metrics.upstream("power", "power_fetch"):
+                    response = await self._get_http_client().get(self.base_url, params=params)
+                    response.raise_for_status()
+            return response.content
+        except httpx.TimeoutException as e:
+            raise Exception(f"NASA POWER API did not answer within {utils.POWER_TIMEOUT:g}s ({type(e).__name__})")
+        except httpx.HTTPError as e:
+            raise Exception(f"Error fetching data from NASA API: {e}")
+
+    async def _download_async(self, latitude, longitude, start_year, end_year):
+        stored = await asyncio.to_thread(self.cache.get_cell, latitude, longitude)
+        fetch_start, base = self._plan_refresh(stored, start_year, end_year)
+        if fetch_start > end_year:
+            return base
+
+        content = await self.download_raw_async(latitude, longitude, fetch_start, end_year)
+        return await asyncio.to_thread(
+            self.store_response, latitude, longitude, fetch_start, end_year, content, base)
+
+    def store_response(self, latitude, longitude, start_year, end_year, content, base=None):
+        """
+        Parse a POWER JSON response body into a PowerSeries and cache it.
+        With base, the new years are appended to it instead.
+        """
+        with metrics.span("parse"):
+            parameter = self._extract_parameter(json.loads(content))
+            series = PowerSeries.from_parameter(parameter, start_year, end_year)
+            if base is not None:
+                series = base.append(series)
+        with metrics.span("cache_write"):
+            return self.cache.put(latitude, longitude, series)
+
     def process_historical_data(self, raw_data):
-        """Convert raw API data to pandas DataFrame"""
-        df_dict = {}
+        """Convert raw API data (a PowerSeries or the POWER parameter dict) to pandas DataFrame"""
+        with metrics.span("process"):
+            return self._process_historical_data(raw_data)
 
-        for param, values in raw_data.items():
-            df_dict[param] = pd.Series(values)
+    def _process_historical_data(self, raw_data):
+        import pandas as pd  # only the DataFrame path needs pandas; not loaded at startup
 
-        df = pd.DataFrame(df_dict)
-        df.index = pd.to_datetime(df.index, format='%Y%m%d')
+        if isinstance(raw_data, PowerSeries):
+            start_date = raw_data.start_date
+            columns = {param: raw_data.column(param) for param in raw_data.variables}
+        else:
+            # Arrays straight from the payload, dates derived from the first key
+            start_date, columns = parse_power_parameter(raw_data)
+
+        n_days = len(next(iter(columns.values())))
+        df = pd.DataFrame(columns, index=pd.date_range(start_date, periods=n_days, freq='D'))
 
         # Add day of year column
         df['day_of_year'] = df.index.dayofyear
@@ -106,14 +297,150 @@ class NASAWeatherAnalyzer:
         df['day'] = df.index.day
 
         return df
-    def analyze_future_date(self, df, future_date):
+
+    def build_climatology_index(self, data):
+        """Precompute the statistics for every day of the year from a PowerSeries or DataFrame"""
+        with metrics.span("index"):
+            if isinstance(data, PowerSeries):
+                return ClimatologyIndex.from_series(data)
+            return ClimatologyIndex.from_dataframe(data)
+
+    async def climatology_index_async(self, latitude, longitude, start_year=None, end_year=None):
+        """Return the cached ClimatologyIndex for the grid cell, building it on a miss"""
+        start_year, end_year = self.default_years(start_year, end_year)
+        key = (self.cache.key(latitude, longitude), start_year, end_year)
+
+        index = self._cached_index(key)
+        metrics.cache_lookup("index", index is not None)
+        if index is None:
+            series = await self.fetch_historical_data_async(latitude, longitude, start_year, end_year)
+            index = await asyncio.to_thread(self._index_series, key, series)
+        return index
+
+    def _cached_index(self, key):
+        # An index built before POWER published the last days is dropped with its series
+        index = self.indexes.get(key)
+        if index is not None and index.gap_fetched_at is not None \
+                and time.time() - index.gap_fetched_at >= utils.POWER_GAP_REFRESH:
+            return None
+        return index
+
+    def _index_series(self, key, series):
+        index = self.build_climatology_index(series)
+        if series.has_trailing_gap():
+            index.gap_fetched_at = series.fetched_at
+        self.indexes.put(key, index)
+        return index
+
+    def cached_index(self, latitude, longitude, start_year=None, end_year=None):
+        """Return the ClimatologyIndex of the cell if its data is already stored, without downloading"""
+        start_year, end_year = self.default_years(start_year, end_year)
+        key = (self.cache.key(latitude, longitude), start_year, end_year)
+
+        index = self._cached_index(key)
+        if index is None:
+            series = self.cache.get(latitude, longitude, start_year, end_year)
+            if series is None:
+                return None
+            index = self._index_series(key, series)
+        return index
+
+    def is_cached(self, latitude, longitude, start_year=None, end_year=None):
+        start_year, end_year = self.default_years(start_year, end_year)
+        key = (self.cache.key(latitude, longitude), start_year, end_year)
+        return self._cached_index(key) is not None or self.cache.get(latitude, longitude, start_year, end_year) is not None
+
+    def prefetch(self, latitude, longitude):
+        """Fetch and index the cell in the background"""
+        task = asyncio.ensure_future(self.climatology_index_async(latitude, longitude))
+        self._background.add(task)
+        task.add_done_callback(lambda t: (self._background.discard(t), t.cancelled() or t.exception()))
+
+    async def interpolate_stats_async(self, latitude, longitude, future_date, window_days=0, radius_km=None):
+        """
+        Estimate the stats of an uncached cell from the nearest stored cells.
+
+        Looks up stored cells within radius_km and blends their precomputed
+        daily statistics with inverse-distance weights. Returns
+        (stats, sources), or None when no stored cell is close enough.
+        """
+        if radius_km is None:
+            radius_km = utils.INTERPOLATION_RADIUS_KM
+        neighbors = await asyncio.to_thread(
+            self.cache.nearest_cells, latitude, longitude, radius_km, utils.INTERPOLATION_NEIGHBORS)
+
+        stats_list, used = [], []
+        for distance, row, col in neighbors:
+            cell_lat, cell_lon = cell_center(row, col)
+            index = await asyncio.to_thread(self.cached_index, cell_lat, cell_lon)
+            if index is None:
+                continue
+            try:
+                stats_list.append(index.stats_for_date(future_date, window_days))
+            except Exception:
+                continue
+            used.append((distance, cell_lat, cell_lon))
+        if not stats_list:
+            return None
+
+        weights = idw_weights([distance for distance, _, _ in used])
+        sources = [
+            {'latitude': lat, 'longitude': lon, 'distance_km': round(distance, 1), 'weight': round(weight, 3)}
+            for (distance, lat, lon), weight in zip(used, weights)
+        ]
+        return interpolate_stats(stats_list, weights), sources
+
+    async def analyze_many_async(self, points):
+        """
+        Analyze many (latitude, longitude, future_date[, window_days]) points at once.
+
+        Points are grouped by grid cell, each cell is fetched and indexed once,
+        and all dates of a cell are looked up together. Returns one stats dict
+        per point, or the Exception that prevented its analysis.
+        """
+        groups = {}
+        for i, (latitude, longitude, future_date, *window) in enumerate(points):
+            if isinstance(future_date, str):
+                future_date = datetime.strptime(future_date, '%Y-%m-%d')
+            cell = self.cache.key(latitude, longitude)
+            groups.setdefault(cell, (latitude, longitude, []))[2].append((i, future_date, window[0] if window else 0))
+
+        indexes = await asyncio.gather(
+            *[self.climatology_index_async(lat, lon) for lat, lon, _ in groups.values()],
+            return_exceptions=True,
+        )
+
+        results = [None] * len(points)
+        for (_, _, members), index in zip(groups.values(), indexes):
+            if isinstance(index, Exception):
+                for i, _, _ in members:
+                    results[i] = index
+                continue
+            by_window = {}
+            for member in members:
+                by_window.setdefault(member[2], []).append(member)
+            for window_days, same_window in by_window.items():
+                stats_list = index.stats_for_dates([d for _, d, _ in same_window], window_days)
+                for (i, d, _), stats in zip(same_window, stats_list):
+                    results[i] = stats if stats is not None else Exception(
+                        f"No historical data found for {d.month}/{d.day}")
+        return results
+
+    def analyze_future_date(self, df, future_date, window_days=0):
         """
         Analyze historical data for the specific day of year
 
         Parameters:
-        - df: DataFrame with historical data
+        - df: DataFrame with historical data, or a ClimatologyIndex
         - future_date: datetime object or string (YYYY-MM-DD)
+        - window_days: int, pool observations from +/- this many days around
+          the date (circular over the year, default: exact day only)
         """
+        if isinstance(df, ClimatologyIndex):
+            return df.stats_for_date(future_date, window_days)
+        if window_days:
+            return self.build_climatology_index(df).stats_for_date(future_date, window_days)
+
         if isinstance(future_date, str):
             future_date = datetime.strptime(future_date, '%Y-%m-%d')
 
@@ -134,35 +461,35 @@ class NASAWeatherAnalyzer:
             temps_c = historical_for_date['T2M'].dropna()
             temps_f = temps_c * 9 / 5 + 32
             stats['temperature'] = {
-                'avg_celsius': round(temps_c.mean(), 1),
-                'min_celsius': round(temps_c.min(), 1),
-                'max_celsius': round(temps_c.max(), 1),
-                #"avg_fahrenheit": round(temps_f.mean(), 1),
-                #"min_fahrenheit": round(temps_f.min(), 1),
-                #"max_fahrenheit": round(temps_f.max(), 1),
-                'std_celsius': round(temps_c.std(), 1),
-                'very_hot_prob': round(((temps_c > 32).sum() / len(temps_c)) * 100, 1),
-                'very_cold_prob': round(((temps_c < 0).sum() / len(temps_c)) * 100, 1)
+                'avg_celsius': round_stat(temps_c.mean(), 1),
+                'min_celsius': round_stat(temps_c.min(), 1),
+                'max_celsius': round_stat(temps_c.max(), 1),
+                #"avg_fahrenheit": round_stat(temps_f.mean(), 1),
+                #"min_fahrenheit": round_stat(temps_f.min(), 1),
+                #"max_fahrenheit": round_stat(temps_f.max(), 1),
+                'std_celsius': round_stat(temps_c.std(), 1),
+                'very_hot_prob': round_stat(((temps_c > 32).sum() / len(temps_c)) * 100, 1),
+                'very_cold_prob': round_stat(((temps_c < 0).sum() / len(temps_c)) * 100, 1)
             }
 
         # Rain / Precipitation
         if 'PRECTOTCORR' in df.columns:
             precip = historical_for_date['PRECTOTCORR'].dropna()
             stats['rain'] = {
-                'avg_mm': round(precip.mean(), 2),
-                'max_mm': round(precip.max(), 2),
-                'rainy_day_prob': round((precip > 0.1).sum() / len(precip) * 100, 1),
-                'heavy_rain_prob': round((precip > 10).sum() / len(precip) * 100, 1)
+                'avg_mm': round_stat(precip.mean(), 2),
+                'max_mm': round_stat(precip.max(), 2),
+                'rainy_day_prob': round_stat((precip > 0.1).sum() / len(precip) * 100, 1),
+                'heavy_rain_prob': round_stat((precip > 10).sum() / len(precip) * 100, 1)
             }
 
         # Specific humidity analysis
         if 'QV2M' in df.columns:
             humidity = historical_for_date['QV2M'].dropna()
             stats['specific_humidity'] = {
-                'avg_g_kg': round(humidity.mean(), 2),
-                'min_g_kg': round(humidity.min(), 2),
-                'max_g_kg': round(humidity.max(), 2),
-                'high_humidity_prob': round((humidity > 15).sum() / len(humidity) * 100, 1),
+                'avg_g_kg': round_stat(humidity.mean(), 2),
+                'min_g_kg': round_stat(humidity.min(), 2),
+                'max_g_kg': round_stat(humidity.max(), 2),
+                'high_humidity_prob': round_stat((humidity > 15).sum() / len(humidity) * 100, 1),
             }
 
         # Wind analysis (U10M - wind at 10 meters)
@@ -170,11 +497,11 @@ class NASAWeatherAnalyzer:
             wind = historical_for_date['U10M'].dropna()
             wind_mph = wind * 2.237  # Convert m/s to mph
             stats['wind'] = {
-                'avg_ms': round(wind.mean(), 1),
-                'avg_mph': round(wind_mph.mean(), 1),
-                'max_mph': round(wind_mph.max(), 1),
-                'very_windy_prob': round((wind_mph > 10).sum() / len(wind_mph) * 100, 1),
-                'extreme_wind_prob': round((wind_mph > 15).sum() / len(wind_mph) * 100, 1),
+                'avg_ms': round_stat(wind.mean(), 1),
+                'avg_mph': round_stat(wind_mph.mean(), 1),
+                'max_mph': round_stat(wind_mph.max(), 1),
+                'very_windy_prob': round_stat((wind_mph > 10).sum() / len(wind_mph) * 100, 1),
+                'extreme_wind_prob': round_stat((wind_mph > 15).sum() / len(wind_mph) * 100, 1),
             }
 
         # Surface pressure analysis
@@ -182,11 +509,11 @@ class NASAWeatherAnalyzer:
             pressure = historical_for_date['PS'].dropna()
             pressure_mb = pressure * 10  # Convert kPa to mb (hPa)
             stats['pressure'] = {
-                'avg_kpa': round(pressure.mean(), 2),
-                'avg_mb': round(pressure_mb.mean(), 1),
-                'min_mb': round(pressure_mb.min(), 1),
-                'max_mb': round(pressure_mb.max(), 1),
-                'low_pressure_prob': round((pressure_mb < 1010).sum() / len(pressure_mb) * 100, 1),
+                'avg_kpa': round_stat(pressure.mean(), 2),
+                'avg_mb': round_stat(pressure_mb.mean(), 1),
+                'min_mb': round_stat(pressure_mb.min(), 1),
+                'max_mb': round_stat(pressure_mb.max(), 1),
+                'low_pressure_prob': round_stat((pressure_mb < 1010).sum() / len(pressure_mb) * 100, 1),
             }
 
         # Calculate "very uncomfortable" conditions
@@ -199,12 +526,53 @@ class NASAWeatherAnalyzer:
             # High temp + high humidity OR extreme cold
             uncomfortable = ((temps_f > 85) & (spec_humidity > 15)) | (temps_f < 35)
             stats['comfort'] = {
-                'very_uncomfortable_prob': round(uncomfortable.sum() / len(uncomfortable) * 100, 1)
+                'very_uncomfortable_prob': round_stat(uncomfortable.sum() / len(uncomfortable) * 100, 1)
             }
 
         stats['sample_size'] = len(historical_for_date)
 
         return stats
+    def best_dates(self, index, activity, start_date, end_date, top_k=5, window_days=0):
+        """
+        Rank every date from start_date to end_date for an activity.
+
+        All 366 day slots of the ClimatologyIndex are scored in one pass, so
+        the cost hardly depends on the length of the range. Returns the
+        activity profile used, the number of dates evaluated and the top_k
+        dates, best first (ties keep date order).
+        """
+        name = scorer.match(activity)
+        if name is None:
+            raise Exception(f"Unknown activity '{activity}', expected one of: {', '.join(scorer.activities)}")
+        if end_date < start_date or (end_date - start_date).days >= 366:
+            raise Exception("end_date must be on or after start_date and at most a year later")
+
+        features = index.feature_matrix(FEATURES, window_days)
+        with metrics.span("score"):
+            scores, penalties = scorer.score_matrix(features)
+        i = scorer.activities.index(name)
+
+        dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        months = dates.astype('datetime64[M]')
+        slots = day_slot(months.astype(int) % 12 + 1, (dates - months).astype(int) + 1)
+        day_scores = scores[slots, i]
+        day_scores[index.window_stats(window_days)['sample_size'][slots] == 0] = np.nan  # no records
+        # A day missing a factor the profile weighs would score as if that factor were perfect
+        day_scores[scorer.missing(features)[slots, i]] = np.nan
+
+        top = [k for k in np.argsort(-day_scores, kind='stable')[:top_k] if not np.isnan(day_scores[k])]
+        picked = [dates[k].astype(object) for k in top]
+        ranked = []
+        for k, day, stats in zip(top, picked, index.stats_for_dates(picked, window_days)):
+            ranked.append({
+                'date': day.isoformat(),
+                'score': round(float(day_scores[k]), 1),
+                'verdict': scorer.verdict(day_scores[k]),
+                'reasons': scorer.reasons(name, features[slots[k]], penalties[slots[k], i]),
+                'statistics': stats,
+            })
+        return {'activity': name, 'evaluated_days': len(dates), 'best_dates': ranked}
+
     def generate_report(self, latitude, longitude, future_date, stats):
         """Generate a human-readable report"""
         if isinstance(future_date, str):
@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app import utils
+from app.spatial import CellGrid, snap_to_grid
+from app.storage import open_series, write_series
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU mapping. With max_bytes, least recently used
+    entries are also dropped while the values' total nbytes is over it;
+    sizes are taken on every put, so values that grow are accounted for.
+    """
+
+    def __init__(self, max_entries, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            if self.max_bytes is not None:
+                total = self.nbytes()
+                while total > self.max_bytes and len(self._data) > 1:
+                    total -= self._data.popitem(last=False)[1].nbytes
+
+    def nbytes(self):
+        return sum(value.nbytes for value in self._data.values())
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """LRU mapping whose entries also expire ttl seconds after insertion, with hit/miss counters"""
+
+    def __init__(self, max_entries, ttl):
+        super().__init__(max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = super().get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            self.pop(key)
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        super().put(key, (time.monotonic() + self.ttl, value))
+
+    def info(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class ClimatologyCache:
+    """
+    Two-level cache of NASA POWER daily series keyed by grid cell.
+
+    Entries live in a bounded in-memory LRU and, when enabled, as
+    memory-mapped columnar files on local disk (see app.storage), which
+    every worker process maps zero-copy. The disk tier is trimmed
+    oldest-access-first once it grows past max_disk_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_memory_entries=None, max_disk_mb=None):
+        self.cache_dir = cache_dir if cache_dir is not None else utils.CACHE_DIR
+        if max_memory_entries is None:
+            max_memory_entries = utils.CACHE_MEMORY_ENTRIES
+        if max_disk_mb is None:
+            max_disk_mb = utils.CACHE_DISK_MAX_MB
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.memory = LRUCache(max_memory_entries)
+        self._disk_lock = threading.Lock()
+        self._disk_sizes = None  # filename -> size, loaded on first disk access
+        self._disk_mtime = None  # cache directory mtime at the last scan
+        self.cells = CellGrid()  # spatial index of the stored cells
+
+    @staticmethod
+    def key(latitude, longitude):
+        row, col = snap_to_grid(latitude, longitude)
+        return f"{row}_{col}"
+
+    def nearest_cells(self, latitude, longitude, radius_km, k=4):
+        """
+        Return up to k (distance_km, row, col) of stored cells within radius_km.
+
+        The directory is re-scanned whenever its mtime changes, so cells
+        written (or evicted) by other workers and app.prewarm are seen too.
+        """
+        if self.max_disk_bytes > 0:
+            with self._disk_lock:
+                self._refresh_disk_index()
+        return self.cells.nearest(latitude, longitude, radius_km, k)
+
+    def get_cell(self, latitude, longitude):
+        """Return whatever PowerSeries is stored for the cell, whatever its year range"""
+        key = self.key(latitude, longitude)
+        series = self.memory.get(key)
+        if series is None:
+            series = self._read_disk(key)
+            if series is not None:
+                self.memory.put(key, series)
+        return series
+
+    def get(self, latitude, longitude, start_year, end_year):
+        """
+        Return the cached PowerSeries for the cell and year range, or None on a
+        miss. A series still missing its last days (POWER publishes with a lag
+        of a few weeks) counts as a miss once it is POWER_GAP_REFRESH old, so
+        the caller downloads its last year again.
+        """
+        series = self.get_cell(latitude, longitude)
+        if series is not None and self.is_stale(series):
+            # Another worker may have refreshed the file already
+            series = self._read_disk(self.key(latitude, longitude))
+            if series is None or self.is_stale(series):
+                return None
+            self.memory.put(self.key(latitude, longitude), series)
+        if series is None or series.start_year != start_year or series.end_year != end_year:
+            return None
+        return series
+
+    @staticmethod
+    def is_stale(series):
+        """True when the series lacks its last days and was downloaded over POWER_GAP_REFRESH ago"""
+        return series.has_trailing_gap() and time.time() - series.fetched_at >= utils.POWER_GAP_REFRESH
+
+    def put(self, latitude, longitude, series):
+        """Store a PowerSeries and return the copy to use, mmap-backed when written to disk"""
+        key = self.key(latitude, longitude)
+        series = self._write_disk(key, series)
+        self.memory.put(key, series)
+        self.cells.add(*snap_to_grid(latitude, longitude))
+        return series
+
+    def clear(self):
+        self.memory.clear()
+        with self._disk_lock:
+            for name in self._load_disk_index():
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+            self._disk_sizes = {}
+        self.cells = CellGrid()
+
+    # ---- disk tier -----------------------------------------------------------
+
+    @staticmethod
+    def _cell_of(filename):
+        row, col = filename[:-len('.pws')].split('_')
+        return int(row), int(col)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pws")
+
+    def _load_disk_index(self):
+        if self._disk_sizes is None:
+            self._disk_sizes = {}
+            if os.path.isdir(self.cache_dir):
+                for item in os.scandir(self.cache_dir):
+                    if item.is_file() and item.name.endswith('.pws'):
+                        self._disk_sizes[item.name] = item.stat().st_size
+                        self.cells.add(*self._cell_of(item.name))
+        return self._disk_sizes
+
+    def _refresh_disk_index(self):
+        try:
+            mtime = os.stat(self.cache_dir).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._disk_mtime:
+            return
+        # Recorded before scanning, so a file added during the scan triggers another one
+        self._disk_mtime = mtime
+        self._disk_sizes = None
+        cells = self.cells
+        self.cells = CellGrid()
+        self._load_disk_index()
+        for row, col in cells.cells():
+            # Cells kept in memory only (not on disk) stay searchable
+            if f"{row}_{col}" in self.memory:
+                self.cells.add(row, col)
+
+    def _read_disk(self, key):
+        if self.max_disk_bytes <= 0:
+            return None
+        path = self._path(key)
+        try:
+            series = open_series(path)
+            # Mark as recently used for eviction; the mtime stays the download time
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+            return series
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, series):
+        if self.max_disk_bytes <= 0:
+            return series
+        with self._disk_lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            sizes = self._load_disk_index()
+            path = self._path(key)
+            write_series(path, series)
+            sizes[os.path.basename(path)] = os.path.getsize(path)
+            self._evict_disk(sizes)
+        try:
+            return open_series(path)
+        except (OSError, ValueError):
+            return series  # evicted straight away, keep the in-memory copy
+
+    def _evict_disk(self, sizes):
+        total = sum(sizes.values())
+        if total <= self.max_disk_bytes:
+            return
+
+        def last_access(name):
+            try:
+                return os.path.getatime(os.path.join(self.cache_dir, name))
+            except OSError:
+                return 0
+
+        for name in sorted(sizes, key=last_access):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= sizes.pop(name)
+            self.cells.discard(*self._cell_of(name))
@@ -1,16 +1,7 @@
-import os
-import uuid
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-import google.generativeai as genai
+from app.gateway import gateway
 
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-def chatbot_llm(activity=None, weather_values=None, history=None, user_message=None):
+def build_chat_prompt(activity=None, weather_values=None, history=None, user_message=None):
 
     values_text = "\n".join(
         [f"- {key}: {val}" for key, val in weather_values.items()]
@@ -65,12 +56,23 @@ Your tasks:
     5. Always sound polite, professional, and helpful — like a friendly guide.
     """
 
-    try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(professional_prompt)
+    return professional_prompt
+
+
+def chatbot_llm(activity=None, weather_values=None, history=None, user_message=None):
+    """Blocking chatbot_llm_async, for scripts; raises gateway.LLMError when the LLM is unavailable"""
+    prompt = build_chat_prompt(activity, weather_values, history, user_message)
+    return gateway.generate_blocking(prompt).strip()
+
+
+async def chatbot_llm_async(activity=None, weather_values=None, history=None, user_message=None):
+    """Return the reply; raises gateway.LLMError when the LLM is unavailable"""
+    prompt = build_chat_prompt(activity, weather_values, history, user_message)
+    return (await gateway.generate(prompt)).strip()
+
 
-        if not response or not hasattr(response, 'text'):
-            raise ValueError("Invalid response from GenAI API")
-        return response.text.strip()
-    except Exception as e:
-        return f"Sorry, I couldn't process your request due to an error: {str(e)}"
\ No newline at end of file
+async def stream_chatbot_llm(activity=None, weather_values=None, history=None, user_message=None):
+    """Yield the reply as it is generated"""
+    prompt = build_chat_prompt(activity, weather_values, history, user_message)
+    async for text in gateway.stream(prompt):
+        yield text
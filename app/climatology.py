@@ -0,0 +1,300 @@
+import warnings
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Day slots follow a leap-year calendar so Feb 29 always has its own slot (59)
+DAYS_PER_YEAR = 366
+_MONTH_OFFSETS = np.array([0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335])
+MAX_WINDOW_DAYS = 30
+_FLOAT_SIZE = 24  # bytes of a Python float object, as held by the rounded stats tables
+
+
+def day_slot(month, day):
+    """Return the 0-365 slot of a month/day in the leap-year calendar"""
+    return _MONTH_OFFSETS[np.asarray(month) - 1] + np.asarray(day) - 1
+
+
+def round_stat(value, digits):
+    """
+    Round a statistic (scalar or array) to digits. The float noise left by
+    the summation order is dropped first, so a mean that is exactly on a
+    rounding boundary rounds the same in the index and the DataFrame path.
+    """
+    return np.round(np.round(value, 9), digits)
+
+
+def _wrap(per_day, window_days):
+    """Pad a per-day array circularly so the year wraps around at Dec 31"""
+    return np.concatenate([per_day[-window_days:], per_day, per_day[:window_days]])
+
+
+class _Window:
+    """
+    Pools the observations of a (366, n_years) array over a circular
+    +/-window_days window around every day at once.
+
+    Sums and counts use cumulative sums over the wrapped per-day totals,
+    min/max a rolling view, so cost does not depend on the window size.
+    """
+
+    def __init__(self, window_days):
+        self.window_days = window_days
+
+    def sum(self, per_year):
+        per_day = np.nansum(per_year, axis=1) if per_year.ndim == 2 else per_year
+        if self.window_days == 0:
+            return per_day
+        width = 2 * self.window_days + 1
+        totals = np.concatenate([[0], np.cumsum(_wrap(per_day, self.window_days))])
+        return totals[width:] - totals[:-width]
+
+    def count(self, mask):
+        return self.sum(mask.sum(axis=1))
+
+    def _rolling(self, per_year, reduce):
+        per_day = reduce(per_year, axis=1)
+        if self.window_days == 0:
+            return per_day
+        width = 2 * self.window_days + 1
+        return reduce(sliding_window_view(_wrap(per_day, self.window_days), width), axis=1)
+
+    def min(self, per_year):
+        return self._rolling(per_year, np.nanmin)
+
+    def max(self, per_year):
+        return self._rolling(per_year, np.nanmax)
+
+    def mean(self, per_year):
+        return self.sum(per_year) / self.count(~np.isnan(per_year))
+
+    def std(self, per_year):
+        # Shift by the overall mean first to keep the sum-of-squares formula stable
+        shifted = per_year - np.nanmean(per_year)
+        n = self.count(~np.isnan(per_year))
+        total = self.sum(shifted)
+        variance = (self.sum(shifted ** 2) - total ** 2 / n) / (n - 1)
+        return np.sqrt(np.maximum(variance, 0))
+
+    def pct(self, mask, per_year):
+        """Share (%) of days where mask holds, out of the non-missing values of per_year"""
+        return self.count(mask) / self.count(~np.isnan(per_year)) * 100
+
+
+class ClimatologyIndex:
+    """
+    Per-location climatology: a (day-of-year x year x variable) array plus
+    the statistics for all 366 days, computed once in a vectorized pass.
+
+    Looking up the stats for any date is a constant-time slice, and gives
+    the same dict as NASAWeatherAnalyzer.analyze_future_date on the DataFrame.
+    Windowed statistics (pooling +/-N days around the target) are computed
+    for all days on first use and kept alongside.
+    """
+
+    def __init__(self, values, present, years, variables):
+        self.values = values  # (366, n_years, n_vars), NaN where missing
+        self.present = present  # (366, n_years), True where the date has a record
+        self.years = years
+        self.variables = list(variables)
+        self.gap_fetched_at = None  # download time of a source series still missing its last days
+        self._stats = {0: self._compute_stats(0)}
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build the index from the DataFrame of process_historical_data"""
+        variables = [c for c in df.columns if c not in ('day_of_year', 'month', 'day')]
+        years = np.arange(df.index.year.min(), df.index.year.max() + 1)
+
+        slots = day_slot(df.index.month.to_numpy(), df.index.day.to_numpy())
+        year_idx = df.index.year.to_numpy() - years[0]
+
+        values = np.full((DAYS_PER_YEAR, len(years), len(variables)), np.nan)
+        values[slots, year_idx] = df[variables].to_numpy(dtype=float)
+        present = np.zeros((DAYS_PER_YEAR, len(years)), dtype=bool)
+        present[slots, year_idx] = True
+        return cls(values, present, years, variables)
+
+    @classmethod
+    def from_series(cls, series):
+        """Build the index straight from a PowerSeries, without going through pandas"""
+        dates = series.dates()
+        months = dates.astype('datetime64[M]')
+        years_of_day = months.astype('datetime64[Y]').astype(int) + 1970
+        slots = day_slot(months.astype(int) % 12 + 1, (dates - months).astype(int) + 1)
+        years = np.arange(years_of_day[0], years_of_day[-1] + 1)
+        year_idx = years_of_day - years[0]
+
+        variables = series.variables
+        values = np.full((DAYS_PER_YEAR, len(years), len(variables)), np.nan)
+        for i, name in enumerate(variables):
+            values[slots, year_idx, i] = series.column(name)
+        present = np.zeros((DAYS_PER_YEAR, len(years)), dtype=bool)
+        present[slots, year_idx] = True
+        return cls(values, present, years, variables)
+
+    @property
+    def stats(self):
+        return self._stats[0]
+
+    @property
+    def nbytes(self):
+        """Approximate memory use, dominated by the stats tables of boxed floats"""
+        size = self.values.nbytes + self.present.nbytes
+        for stats in self._stats.values():
+            for section, fields in stats.items():
+                if section == 'sample_size':
+                    size += fields.nbytes
+                else:
+                    size += sum(array.nbytes + _FLOAT_SIZE * len(array) for array in fields.values())
+        return size
+
+    def column(self, name):
+        return self.values[:, :, self.variables.index(name)]
+
+    def window_stats(self, window_days=0):
+        """Return the per-day statistic arrays for a +/-window_days window"""
+        if not 0 <= window_days <= MAX_WINDOW_DAYS:
+            raise Exception(f"window_days must be between 0 and {MAX_WINDOW_DAYS}")
+        if window_days not in self._stats:
+            self._stats[window_days] = self._compute_stats(window_days)
+        return self._stats[window_days]
+
+    def feature_matrix(self, fields, window_days=0):
+        """
+        Return a (366, len(fields)) float array of the 'section.name' stats
+        for every day slot; NaN where a day or a section has no data.
+        """
+        all_stats = self.window_stats(window_days)
+        matrix = np.full((DAYS_PER_YEAR, len(fields)), np.nan)
+        for j, field in enumerate(fields):
+            section, name = field.split('.', 1)
+            if name in all_stats.get(section, {}):
+                matrix[:, j] = np.array(all_stats[section][name], dtype=np.float64)
+        return matrix
+
+    def _compute_stats(self, window_days):
+        w = _Window(window_days)
+        stats = {}
+        with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+            # All-NaN days (e.g. Feb 29 with no leap year in range) just give NaN
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+
+            if 'T2M' in self.variables:
+                temps_c = self.column('T2M')
+                stats['temperature'] = {
+                    'avg_celsius': (w.mean(temps_c), 1),
+                    'min_celsius': (w.min(temps_c), 1),
+                    'max_celsius': (w.max(temps_c), 1),
+                    'std_celsius': (w.std(temps_c), 1),
+                    'very_hot_prob': (w.pct(temps_c > 32, temps_c), 1),
+                    'very_cold_prob': (w.pct(temps_c < 0, temps_c), 1),
+                }
+
+            if 'PRECTOTCORR' in self.variables:
+                precip = self.column('PRECTOTCORR')
+                stats['rain'] = {
+                    'avg_mm': (w.mean(precip), 2),
+                    'max_mm': (w.max(precip), 2),
+                    'rainy_day_prob': (w.pct(precip > 0.1, precip), 1),
+                    'heavy_rain_prob': (w.pct(precip > 10, precip), 1),
+                }
+
+            if 'QV2M' in self.variables:
+                humidity = self.column('QV2M')
+                stats['specific_humidity'] = {
+                    'avg_g_kg': (w.mean(humidity), 2),
+                    'min_g_kg': (w.min(humidity), 2),
+                    'max_g_kg': (w.max(humidity), 2),
+                    'high_humidity_prob': (w.pct(humidity > 15, humidity), 1),
+                }
+
+            if 'U10M' in self.variables:
+                wind = self.column('U10M')
+                wind_mph = wind * 2.237  # Convert m/s to mph
+                stats['wind'] = {
+                    'avg_ms': (w.mean(wind), 1),
+                    'avg_mph': (w.mean(wind_mph), 1),
+                    'max_mph': (w.max(wind_mph), 1),
+                    'very_windy_prob': (w.pct(wind_mph > 10, wind), 1),
+                    'extreme_wind_prob': (w.pct(wind_mph > 15, wind), 1),
+                }
+
+            if 'PS' in self.variables:
+                pressure = self.column('PS')
+                pressure_mb = pressure * 10  # Convert kPa to mb (hPa)
+                stats['pressure'] = {
+                    'avg_kpa': (w.mean(pressure), 2),
+                    'avg_mb': (w.mean(pressure_mb), 1),
+                    'min_mb': (w.min(pressure_mb), 1),
+                    'max_mb': (w.max(pressure_mb), 1),
+                    'low_pressure_prob': (w.pct(pressure_mb < 1010, pressure), 1),
+                }
+
+            sample_size = w.count(self.present)
+
+            # High temp + high humidity OR extreme cold, over every record of the day
+            if 'T2M' in self.variables and 'QV2M' in self.variables:
+                temps_f = self.column('T2M') * 9 / 5 + 32
+                spec_humidity = self.column('QV2M')
+                uncomfortable = ((temps_f > 85) & (spec_humidity > 15)) | (temps_f < 35)
+                stats['comfort'] = {
+                    'very_uncomfortable_prob': (w.count(uncomfortable) / sample_size * 100, 1),
+                }
+
+        # Round once for all days, keeping NaN as None so results stay JSON-safe
+        rounded = {}
+        for section, fields in stats.items():
+            rounded[section] = {}
+            for name, (array, digits) in fields.items():
+                rounded[section][name] = np.array(
+                    [None if np.isnan(v) else v for v in round_stat(array, digits).tolist()],
+                    dtype=object,
+                )
+        rounded['sample_size'] = sample_size
+        return rounded
+
+    def stats_for_slot(self, slot, window_days=0):
+        slot = int(slot)
+        stats = {}
+        for section, fields in self.window_stats(window_days).items():
+            if section == 'sample_size':
+                continue
+            stats[section] = {name: array[slot] for name, array in fields.items()}
+        stats['sample_size'] = int(self.window_stats(window_days)['sample_size'][slot])
+        return stats
+
+    def stats_for_dates(self, dates, window_days=0):
+        """
+        Return one stats dict per date, slicing every statistic once for the
+        whole batch. Dates with no historical records give None.
+        """
+        all_stats = self.window_stats(window_days)
+        slots = day_slot([d.month for d in dates], [d.day for d in dates])
+        columns = {
+            section: {name: array[slots] for name, array in fields.items()}
+            for section, fields in all_stats.items() if section != 'sample_size'
+        }
+        sample_sizes = all_stats['sample_size'][slots].tolist()
+
+        results = []
+        for i, sample_size in enumerate(sample_sizes):
+            if sample_size == 0:
+                results.append(None)
+                continue
+            stats = {section: {name: values[i] for name, values in fields.items()}
+                     for section, fields in columns.items()}
+            stats['sample_size'] = sample_size
+            results.append(stats)
+        return results
+
+    def stats_for_date(self, future_date, window_days=0):
+        """Return the stats dict for the month/day of future_date"""
+        if isinstance(future_date, str):
+            future_date = datetime.strptime(future_date, '%Y-%m-%d')
+
+        slot = day_slot(future_date.month, future_date.day)
+        if self.window_stats(window_days)['sample_size'][slot] == 0:
+            raise Exception(f"No historical data found for {future_date.month}/{future_date.day}")
+        return self.stats_for_slot(slot, window_days)
@@ -0,0 +1,189 @@
+"""
+Streaming bulk export of the statistics and, optionally, the daily series
+behind them, for any number of locations.
+
+Locations are loaded a few at a time ahead of the writer and the series
+are written in fixed-size day chunks straight from the cached float32
+columns, so memory stays flat whatever the series length or batch size.
+
+Formats:
+- csv: long format, `record,latitude,longitude,date,field,value`, with
+  `stat` rows (date = target date), `series` rows (one per day and
+  variable) and `error` rows
+- ndjson: a `stats` object per location, then one `day` object per day
+- columnar: per location a frame of a little-endian uint32 length, that
+  many bytes of JSON metadata and, when metadata["series"] is set, a
+  series in the app.storage file format (header plus float32 columns);
+  read it back with read_columnar()
+"""
+import asyncio
+import csv
+import io
+import json
+import struct
+from collections import deque
+
+import numpy as np
+
+from app.storage import header_bytes, series_from_bytes, series_nbytes
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'columnar': 'application/octet-stream',
+}
+CHUNK_DAYS = 1024  # days written per chunk
+LOOKAHEAD = 4  # locations loaded ahead of the writer
+
+_FRAME = struct.Struct("<I")
+
+
+def flatten_stats(stats, prefix=""):
+    """Yield ('section.field', value) for every leaf of a stats dict"""
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from flatten_stats(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+async def _load(analyzer, item, include_series):
+    index = await analyzer.climatology_index_async(item.latitude, item.longitude)
+    stats = analyzer.analyze_future_date(index, item.future_date, item.window_days)
+    series = await analyzer.fetch_historical_data_async(item.latitude, item.longitude) if include_series else None
+    return stats, series
+
+
+async def _locations(analyzer, items, include_series):
+    """Yield (item, stats, series, error) in request order, loading up to LOOKAHEAD locations ahead"""
+    pending = deque()
+    remaining = iter(items)
+
+    def schedule():
+        item = next(remaining, None)
+        if item is not None:
+            pending.append((item, asyncio.ensure_future(_load(analyzer, item, include_series))))
+
+    for _ in range(LOOKAHEAD):
+        schedule()
+    try:
+        while pending:
+            item, task = pending.popleft()
+            schedule()
+            try:
+                stats, series = await task
+            except Exception as e:
+                yield item, None, None, str(e)
+                continue
+            yield item, stats, series, None
+    finally:
+        # The client went away: do not keep loading for it
+        for _, task in pending:
+            task.cancel()
+
+
+def _day_chunks(series):
+    """Yield (ISO dates, {variable: float64 values rounded to the source precision}) per chunk"""
+    for start in range(0, series.n_days, CHUNK_DAYS):
+        stop = min(start + CHUNK_DAYS, series.n_days)
+        dates = np.datetime_as_string(np.datetime64(series.start_date, 'D') + np.arange(start, stop))
+        values = {
+            name: np.round(column[start:stop].astype(np.float64), series.decimals)
+            for name, column in series.columns.items()
+        }
+        yield dates, values
+
+
+def _csv_text(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+def _csv_location(item, stats, series, error):
+    lat, lon, target = item.latitude, item.longitude, item.future_date.isoformat()
+    if error is not None:
+        yield _csv_text([('error', lat, lon, target, '', error)])
+        return
+    yield _csv_text(('stat', lat, lon, target, field, '' if value is None else value)
+                    for field, value in flatten_stats(stats))
+    if series is None:
+        return
+    for dates, values in _day_chunks(series):
+        rows = []
+        for i, day in enumerate(dates.tolist()):
+            for name, column in values.items():
+                value = column[i]
+                rows.append(('series', lat, lon, day, name, '' if np.isnan(value) else value))
+        yield _csv_text(rows)
+
+
+def _location_meta(item, stats, error):
+    return {
+        'location': {'latitude': item.latitude, 'longitude': item.longitude},
+        'target_date': item.future_date.isoformat(),
+        'window_days': item.window_days,
+        'statistics': stats,
+        'error': error,
+    }
+
+
+def _ndjson_location(item, stats, series, error):
+    yield json.dumps({'type': 'error' if error else 'stats', **_location_meta(item, stats, error)}) + "\n"
+    if series is None:
+        return
+    location = {'latitude': item.latitude, 'longitude': item.longitude}
+    for dates, values in _day_chunks(series):
+        columns = {name: [None if np.isnan(v) else v for v in column.tolist()] for name, column in values.items()}
+        yield "".join(
+            json.dumps({'type': 'day', **location, 'date': day, **{name: column[i] for name, column in columns.items()}})
+            + "\n"
+            for i, day in enumerate(dates.tolist())
+        )
+
+
+def _columnar_location(item, stats, series, error):
+    meta = _location_meta(item, stats, error)
+    if series is not None:
+        meta['series'] = {
+            'variables': series.variables,
+            'start_date': series.start_date.isoformat(),
+            'n_days': series.n_days,
+            'nbytes': series_nbytes(series),
+        }
+    encoded = json.dumps(meta).encode()
+    yield _FRAME.pack(len(encoded)) + encoded
+    if series is None:
+        return
+    yield header_bytes(series)
+    for column in series.columns.values():
+        for start in range(0, series.n_days, CHUNK_DAYS * 16):
+            yield np.ascontiguousarray(column[start:start + CHUNK_DAYS * 16], dtype='<f4').tobytes()
+
+
+_WRITERS = {'csv': _csv_location, 'ndjson': _ndjson_location, 'columnar': _columnar_location}
+
+
+async def stream_export(analyzer, items, fmt='csv', include_series=False):
+    """Async iterator of the export of items (WeatherRequest-like) in fmt, for StreamingResponse"""
+    if fmt not in _WRITERS:
+        raise Exception(f"Unknown export format: {fmt}")
+    write = _WRITERS[fmt]
+    if fmt == 'csv':
+        yield "record,latitude,longitude,date,field,value\n"
+    async for item, stats, series, error in _locations(analyzer, items, include_series):
+        for chunk in write(item, stats, series, error):
+            yield chunk
+
+
+def read_columnar(f):
+    """Read a columnar export from a binary file object: yields (metadata, PowerSeries or None)"""
+    while True:
+        size = f.read(_FRAME.size)
+        if not size:
+            return
+        meta = json.loads(f.read(_FRAME.unpack(size)[0]))
+        series = None
+        if meta.get('series'):
+            series = series_from_bytes(f.read(meta['series']['nbytes']))
+        yield meta, series
@@ -0,0 +1,253 @@
+"""
+Single gateway for every Gemini call (activity summaries and chat).
+
+It keeps one model client for the whole process, lets at most
+LLM_MAX_CONCURRENCY calls run at once with up to LLM_MAX_QUEUE more
+waiting for a slot, and gives each call a deadline of LLM_TIMEOUT seconds,
+queueing and retries included. Transient provider errors (429, 5xx,
+timeouts) are retried with jittered exponential backoff. A call that finds
+the queue full, or cannot get a slot before its deadline, is shed with
+LLMOverloaded so the API can answer 503 instead of piling on the provider.
+
+generate_blocking() is the same for scripts, on the SDK's sync client: the
+async one is shared by the whole process and bound to the first event loop
+that uses it, so it cannot be driven from a new asyncio.run() per call.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from app import metrics, utils
+
+TRANSIENT_CODES = {408, 429, 500, 502, 503, 504}
+
+LLM_SHED = metrics.Counter("skyra_llm_shed_total", "LLM calls rejected by the gateway", ("reason",))
+LLM_RETRIES = metrics.Counter("skyra_llm_retries_total", "LLM calls retried after a transient error")
+
+
+class LLMError(Exception):
+    """The LLM call failed; status_code is the HTTP status to answer with"""
+    status_code = 502
+    retry_after = None
+
+
+class LLMTimeout(LLMError):
+    status_code = 504
+
+
+class LLMOverloaded(LLMError):
+    """Too much load: shed by the gateway, or the provider kept rejecting the call"""
+    status_code = 503
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.retry_after = utils.LLM_RETRY_AFTER
+
+
+def _transient(error):
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # google.api_core exceptions carry the HTTP status as `code`
+    return getattr(error, "code", None) in TRANSIENT_CODES
+
+
+class LLMGateway:
+    def __init__(self, model_name=None, max_concurrency=None, max_queue=None, timeout=None, retries=None,
+                 backoff=None):
+        self.model_name = model_name or utils.LLM_MODEL
+        self.max_concurrency = max_concurrency if max_concurrency is not None else utils.LLM_MAX_CONCURRENCY
+        self.max_queue = max_queue if max_queue is not None else utils.LLM_MAX_QUEUE
+        self.timeout = timeout if timeout is not None else utils.LLM_TIMEOUT
+        self.retries = retries if retries is not None else utils.LLM_RETRIES
+        self.backoff = backoff if backoff is not None else utils.LLM_RETRY_BACKOFF
+        self.running = 0
+        self.waiting = 0
+        self._model = None
+        self._loop = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._blocking_slots = threading.Semaphore(self.max_concurrency)
+
+    @property
+    def model(self):
+        """The shared model client, created (and the SDK imported) on first use"""
+        if self._model is None:
+            # google.generativeai takes longer to import than the rest of the app together
+            import google.generativeai as genai
+
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def warm(self):
+        """Create the client ahead of the first call, e.g. in a background thread at startup"""
+        return self.model
+
+    def info(self):
+        return {
+            'model': self.model_name,
+            'running': self.running,
+            'waiting': self.waiting,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+        }
+
+    def _semaphore(self):
+        # asyncio primitives belong to one event loop (a new one per asyncio.run or test client)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._slots = loop, asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    @asynccontextmanager
+    async def _slot(self, deadline):
+        """Hold one of the max_concurrency slots, or raise LLMOverloaded"""
+        slots = self._semaphore()
+        if slots.locked():
+            if self.waiting >= self.max_queue:
+                LLM_SHED.inc(reason="queue_full")
+                raise LLMOverloaded("Too many LLM requests in progress, try again shortly")
+            self.waiting += 1
+            try:
+                async with asyncio.timeout_at(deadline):
+                    await slots.acquire()
+            except TimeoutError:
+                LLM_SHED.inc(reason="queue_timeout")
+                raise LLMOverloaded("Timed out waiting for an LLM slot, try again shortly")
+            finally:
+                self.waiting -= 1
+        else:
+            await slots.acquire()
+
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            slots.release()
+
+    @contextmanager
+    def _blocking_slot(self, deadline):
+        """_slot for threads; deadline is on the time.monotonic() clock"""
+        if not self._blocking_slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_queue:
+                    LLM_SHED.inc(reason="queue_full")
+                    raise LLMOverloaded("Too many LLM requests in progress, try again shortly")
+                self.waiting += 1
+            try:
+                acquired = self._blocking_slots.acquire(timeout=max(deadline - time.monotonic(), 0))
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not acquired:
+                LLM_SHED.inc(reason="queue_timeout")
+                raise LLMOverloaded("Timed out waiting for an LLM slot, try again shortly")
+
+        with self._lock:
+            self.running += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running -= 1
+            self._blocking_slots.release()
+
+    def _retry_delay(self, error, attempt, remaining):
+        """Seconds to wait before the next attempt, or raise the LLMError that ends the call"""
+        if isinstance(error, TimeoutError):
+            raise LLMTimeout(f"LLM request timed out after {self.timeout:g}s") from error
+        if not _transient(error):
+            raise LLMError(f"LLM request failed: {error}") from error
+        delay = random.uniform(0, self.backoff * 2 ** attempt)  # full jitter
+        if attempt >= self.retries or delay >= remaining:
+            raise LLMOverloaded(f"LLM provider unavailable, try again shortly: {error}") from error
+        LLM_RETRIES.inc()
+        return delay
+
+    async def _before_retry(self, error, attempt, deadline):
+        """Sleep before the next attempt, or raise the LLMError that ends the call"""
+        await asyncio.sleep(self._retry_delay(error, attempt, deadline - self._loop.time()))
+
+    async def generate(self, prompt):
+        """Return the text the model generates for prompt"""
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        async with self._slot(deadline):
+            for attempt in range(self.retries + 1):
+                try:
+                    with metrics.upstream("gemini", "llm"):
+                        async with asyncio.timeout_at(deadline):
+                            response = await self.model.generate_content_async(prompt)
+                        return response.text
+                except Exception as e:
+                    await self._before_retry(e, attempt, deadline)
+
+    def generate_blocking(self, prompt):
+        """generate() for code without an event loop, with the same limits, deadline and retries"""
+        deadline = time.monotonic() + self.timeout
+        with self._blocking_slot(deadline):
+            for attempt in range(self.retries + 1):
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise TimeoutError()
+                    with metrics.upstream("gemini", "llm"):
+                        response = self.model.generate_content(prompt, request_options={"timeout": remaining})
+                        return response.text
+                except Exception as e:
+                    time.sleep(self._retry_delay(e, attempt, deadline - time.monotonic()))
+
+    async def stream(self, prompt):
+        """
+        Yield the text for prompt as it is generated; retried only until the first chunk.
+
+        A separate task reads the model into a queue, so the deadline and the
+        concurrency slot cover generation only: a slow client reading the
+        chunks neither times the call out nor keeps other callers waiting.
+        """
+        chunks = asyncio.Queue()
+        producer = asyncio.create_task(self._produce(prompt, chunks))
+        try:
+            while True:
+                item = await chunks.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()  # no-op once generation is over; stops it if the client went away
+
+    async def _produce(self, prompt, chunks):
+        """Put the generated text, then None (or the LLMError that ended the call), on chunks"""
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        try:
+            async with self._slot(deadline):
+                for attempt in range(self.retries + 1):
+                    started = False
+                    try:
+                        with metrics.upstream("gemini", "llm"):
+                            async with asyncio.timeout_at(deadline):
+                                response = await self.model.generate_content_async(prompt, stream=True)
+                                async for chunk in response:
+                                    if chunk.text:
+                                        started = True
+                                        chunks.put_nowait(chunk.text)
+                        break
+                    except Exception as e:
+                        if started and not isinstance(e, TimeoutError):
+                            raise LLMError(f"LLM stream interrupted: {e}") from e
+                        await self._before_retry(e, attempt, deadline)  # raises LLMTimeout on the deadline
+        except LLMError as e:
+            chunks.put_nowait(e)
+        else:
+            chunks.put_nowait(None)
+
+
+gateway = LLMGateway()
+
+metrics.Gauge("skyra_llm_calls", "LLM calls in the gateway, by state", ("state",),
+              callback=lambda: [({"state": "running"}, gateway.running), ({"state": "waiting"}, gateway.waiting)])
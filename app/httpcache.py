@@ -0,0 +1,42 @@
+import hashlib
+import json
+import re
+
+from app import utils
+from app.spatial import snap_to_grid
+
+# Bump when the /analyze output changes shape, so clients drop old validators
+ETAG_VERSION = 1
+
+
+def analysis_etag(request, export, summary, start_year, end_year):
+    """
+    Weak ETag of an /analyze response, derived only from what the result
+    depends on: the grid cell, the month/day, the data vintage (year range),
+    the window, the activity and the output mode. Computing it never
+    touches the analyzer, so a matching If-None-Match costs nothing.
+    """
+    row, col = snap_to_grid(request.latitude, request.longitude)
+    activity = re.sub(r"\s+", " ", request.activity or "").strip().lower()
+    key = [
+        ETAG_VERSION, row, col, request.future_date.month, request.future_date.day, request.window_days,
+        start_year, end_year, activity, export, summary,
+        utils.SCORE_SUITABLE_MIN, utils.SCORE_UNSUITABLE_MAX,
+    ]
+    digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()[:32]
+    # Weak: LLM wording and the analysis date may differ between equivalent responses
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check, with the weak comparison RFC 9110 (13.1.2) prescribes"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def cache_headers(etag):
+    return {"ETag": etag, "Cache-Control": f"public, max-age={utils.ANALYZE_CACHE_MAX_AGE}"}
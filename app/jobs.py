@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+
+from app import utils
+from app.cache import TTLCache
+from app.llm import interact_llm_async
+
+
+class SummaryJobQueue:
+    """
+    Runs LLM activity summaries in the background on a fixed number of
+    worker tasks, so /analyze can return its statistics right away.
+
+    The wait queue is bounded: submit() returns None instead of queueing
+    once it is full. Finished jobs are kept for job_ttl seconds.
+    """
+
+    def __init__(self, workers=None, max_queue=None, job_ttl=None):
+        self.workers = workers if workers is not None else utils.SUMMARY_WORKERS
+        self.max_queue = max_queue if max_queue is not None else utils.SUMMARY_QUEUE_SIZE
+        job_ttl = job_ttl if job_ttl is not None else utils.SUMMARY_JOB_TTL
+        self.jobs = TTLCache(utils.SUMMARY_JOB_MAX, job_ttl)
+        self._queue = None
+        self._tasks = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, activity, stats, assessment=None):
+        """Queue a summary job and return its id, or None when the queue is full"""
+        if self._queue is None:
+            raise Exception("Summary job queue is not running")
+
+        job_id = str(uuid.uuid4())
+        job = {'status': 'pending', 'summary': None, 'done': asyncio.Event()}
+        try:
+            self._queue.put_nowait((job_id, job, activity, stats, assessment))
+        except asyncio.QueueFull:
+            return None
+        self.jobs.put(job_id, job)
+        return job_id
+
+    async def result(self, job_id, wait=0):
+        """Return the job status, waiting up to `wait` seconds for it to finish"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if wait > 0 and not job['done'].is_set():
+            try:
+                await asyncio.wait_for(job['done'].wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+        return {'job_id': job_id, 'status': job['status'], 'llm_summary': job['summary']}
+
+    def info(self):
+        return {
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue': self.max_queue,
+            'jobs': len(self.jobs),
+        }
+
+    async def _worker(self):
+        while True:
+            job_id, job, activity, stats, assessment = await self._queue.get()
+            job['status'] = 'running'
+            try:
+                job['summary'] = await interact_llm_async(activity, stats, assessment)
+                job['status'] = 'done'
+            except Exception as e:
+                job['summary'] = f"Sorry, I couldn't process your request due to an error: {str(e)}"
+                job['status'] = 'failed'
+            finally:
+                job['done'].set()
+                self.jobs.put(job_id, job)  # keep it job_ttl seconds from completion
+                self._queue.task_done()
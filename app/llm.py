@@ -1,13 +1,59 @@
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-import google.generativeai as genai
-
-# Configure the API key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-def interact_llm(activity=None, weather_values=None):
+import re
+
+from app import metrics, utils
+from app.cache import TTLCache
+from app.gateway import gateway
+
+# Summaries of near-identical (activity, stats) pairs are reused
+summary_cache = TTLCache(utils.LLM_CACHE_ENTRIES, utils.LLM_CACHE_TTL)
+
+
+def _quantize(name, value):
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return value
+    for suffix, step in utils.LLM_CACHE_BUCKETS.items():
+        if name.endswith(suffix):
+            return round(value / step) * step
+    return value
+
+
+def _flatten(values, prefix=""):
+    for key, val in values.items():
+        if isinstance(val, dict):
+            yield from _flatten(val, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", val
+
+
+def summary_cache_key(activity=None, weather_values=None, assessment=None):
+    """Key on the normalized activity, the rule-based verdict and the stats rounded into coarse buckets"""
+    activity = re.sub(r"\s+", " ", activity or "").strip().lower()
+    if assessment:
+        activity = (activity, assessment.get('verdict'))
+    if not weather_values:
+        return activity, ()
+    return activity, tuple(sorted(
+        (name, _quantize(name, value))
+        for name, value in _flatten(weather_values)
+        if name != "sample_size"
+    ))
+
+
+def _assessment_text(assessment):
+    if not assessment or assessment.get('activity') is None:
+        return "None (no rule profile for this activity)."
+    if assessment['score'] is None:
+        return f"- Not scored: {'; '.join(assessment['reasons'])}"
+    lines = [f"- Verdict: {assessment['verdict']} (score {assessment['score']}/100)"]
+    if assessment['reasons']:
+        lines.append(f"- Main factors: {'; '.join(assessment['reasons'])}")
+    if assessment['alternatives']:
+        lines.append("- Best-scoring alternatives: " + ", ".join(
+            f"{alt['activity']} ({alt['score']}/100)" for alt in assessment['alternatives']))
+    return "\n".join(lines)
+
+
+def build_prompt(activity=None, weather_values=None, assessment=None):
     values_text = "\n".join(
         [f"- {key}: {val}" for key, val in weather_values.items()]
     )if weather_values else "No weather values provided yet."
@@ -42,9 +88,12 @@ Context:
 - User’s activity of interest: **{activity if activity else "Not specified"}**
 - Weather data available:
 {values_text if values_text else "No weather data provided."}
+- Pre-computed suitability from historical thresholds:
+{_assessment_text(assessment)}
 
 Your tasks:
 1. If an **activity is specified**, analyze whether current conditions are suitable, risky, or unsafe for that activity.
+   - When a pre-computed verdict is given, explain it rather than contradict it; for a borderline score, weigh the factors and say what to watch for.
    - Mention key factors such as temperature, precipitation, wind speed, and pressure.
    - If unsuitable, recommend **2 alternative activities** (indoor or outdoor depending on conditions).
 2. If **no activity is provided**, create a short and professional **weather summary only**, focusing on:
@@ -69,15 +118,53 @@ Temperatures range from 22°C to 27°C with mild winds and low precipitation cha
 Overall, it’s a comfortable and partly cloudy day with good air stability — ideal for most outdoor plans."
 """
 
-    try:
-        # Create the model
-        model = genai.GenerativeModel("gemini-2.5-flash")
-
-        # Generate content
-        response = model.generate_content(professional_prompt)
-
-        if not response or not hasattr(response, 'text'):
-            raise ValueError("Invalid response from GenAI API")
-        return response.text
-    except Exception as e:
-        return f"Sorry, I couldn't process your request due to an error: {str(e)}"
\ No newline at end of file
+    return professional_prompt
+
+
+def interact_llm(activity=None, weather_values=None, assessment=None):
+    """Blocking interact_llm_async, for scripts; raises gateway.LLMError when the LLM is unavailable"""
+    if utils.LLM_CACHE_TTL > 0:
+        key = summary_cache_key(activity, weather_values, assessment)
+        cached = summary_cache.get(key)
+        metrics.cache_lookup("llm_summary", cached is not None)
+        if cached is not None:
+            return cached
+
+    text = gateway.generate_blocking(build_prompt(activity, weather_values, assessment))
+    if utils.LLM_CACHE_TTL > 0:
+        summary_cache.put(key, text)
+    return text
+
+
+async def interact_llm_async(activity=None, weather_values=None, assessment=None):
+    """Return the activity summary; raises gateway.LLMError when the LLM is unavailable"""
+    if utils.LLM_CACHE_TTL > 0:
+        key = summary_cache_key(activity, weather_values, assessment)
+        cached = summary_cache.get(key)
+        metrics.cache_lookup("llm_summary", cached is not None)
+        if cached is not None:
+            return cached
+
+    text = await gateway.generate(build_prompt(activity, weather_values, assessment))
+    if utils.LLM_CACHE_TTL > 0:
+        summary_cache.put(key, text)
+    return text
+
+
+async def stream_interact_llm(activity=None, weather_values=None, assessment=None):
+    """Yield the summary as it is generated, caching the full text at the end"""
+    if utils.LLM_CACHE_TTL > 0:
+        key = summary_cache_key(activity, weather_values, assessment)
+        cached = summary_cache.get(key)
+        metrics.cache_lookup("llm_summary", cached is not None)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    async for text in gateway.stream(build_prompt(activity, weather_values, assessment)):
+        parts.append(text)
+        yield text
+
+    if parts and utils.LLM_CACHE_TTL > 0:
+        summary_cache.put(key, "".join(parts))
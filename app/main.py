@@ -1,16 +1,57 @@
-import uuid
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import date
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query
 from app.analyzer import NASAWeatherAnalyzer
-from app.chatbot import chatbot_llm
-from app.llm import interact_llm
-from app.schemas import WeatherRequest, ChatRequest
-from fastapi.responses import JSONResponse, PlainTextResponse
+from app import httpcache, metrics, utils
+from app.jobs import SummaryJobQueue
+from app.sessions import create_session_store
+from app.chatbot import chatbot_llm_async, stream_chatbot_llm
+from app.llm import interact_llm_async, stream_interact_llm, summary_cache
+from app.scoring import CLEAR_VERDICTS, scorer, summarize
+from app.export import FORMATS, stream_export
+from app.gateway import LLMError, gateway
+from app.schemas import WeatherRequest, BatchWeatherRequest, BestDatesRequest, ChatRequest, ExportRequest
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
-app = FastAPI(title="NASA Weather Probability API")
+logger = logging.getLogger(__name__)
 
 analyzer = NASAWeatherAnalyzer()
+summary_jobs = SummaryJobQueue()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event with a JSON payload"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def _log_warmup_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("LLM warmup failed, the client will be created on first use", exc_info=future.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await summary_jobs.start()
+    if utils.LLM_WARMUP:
+        # In a thread, so the server accepts requests while the Gemini SDK loads;
+        # the future stays referenced here until shutdown
+        warmup = asyncio.get_running_loop().run_in_executor(None, gateway.warm)
+        warmup.add_done_callback(_log_warmup_failure)
+    yield
+    await summary_jobs.stop()
+    await analyzer.aclose()
+
+
+app = FastAPI(title="NASA Weather Probability API", lifespan=lifespan)
+
 origins = [
     "https://skyra-iota.vercel.app",  # frontend dev server
     "http://localhost:3000",          # Common React/Next/Vite default port
@@ -23,68 +64,358 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],         # allow all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],         # allow all headers
+    expose_headers=["Server-Timing", "ETag"],
 )
-@app.post("/analyze")
-async def analyze_weather(request: WeatherRequest, export: str = Query("json", enum=["json", "csv", "none"])):
+app.add_middleware(metrics.MetricsMiddleware)
+
+metrics.Gauge("skyra_summary_queue_depth", "LLM summary jobs waiting for a worker",
+              callback=lambda: summary_jobs.info()["queue_depth"])
+
+
+async def compute_stats(request: WeatherRequest):
+    """
+    Stats for a request, plus the nearby cells they were interpolated from
+    (None when computed from the exact grid cell)
+    """
+    if request.interpolate and not analyzer.is_cached(request.latitude, request.longitude):
+        interpolated = await analyzer.interpolate_stats_async(
+            request.latitude, request.longitude, request.future_date, request.window_days)
+        if interpolated is not None:
+            # Serve the estimate now, and fill in the exact cell for next time
+            analyzer.prefetch(request.latitude, request.longitude)
+            return interpolated
+
+    index = await analyzer.climatology_index_async(request.latitude, request.longitude)
+    with metrics.span("analyze"):
+        return analyzer.analyze_future_date(index, request.future_date, request.window_days), None
+
+
+def assess(activity, stats):
+    with metrics.span("score"):
+        return scorer.assess(activity, stats)
+
+
+async def activity_summary(activity, stats, assessment, summary="auto"):
+    """
+    Return (summary text, source). In auto mode a clear-cut rule verdict is
+    phrased directly and the LLM is only asked about ambiguous cases.
+    """
+    if summary == "auto" and assessment["verdict"] in CLEAR_VERDICTS:
+        return summarize(assessment), "rules"
+    try:
+        return await interact_llm_async(activity, stats, assessment), "llm"
+    except LLMError:
+        # In auto mode a scored verdict is still a useful answer when the LLM is busy or down
+        if summary == "auto" and assessment["score"] is not None:
+            return summarize(assessment), "rules"
+        raise
+
+
+def llm_http_error(e):
+    """HTTPException for an LLMError: 503 with Retry-After when shed, 502/504 when the provider failed"""
+    headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+    return HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+
+
+def export_json(request: WeatherRequest, stats, sources):
+    result = analyzer.export_to_json(request.latitude, request.longitude, request.future_date, stats)
+    result["metadata"]["interpolated"] = sources is not None
+    if sources is not None:
+        result["metadata"]["interpolation_sources"] = sources
+    return result
+
+
+async def run_analysis(request, export, summary, if_none_match=None, method="GET"):
+    """
+    summary: `auto` answers clear-cut cases from the rule-based score and
+    asks the LLM only when it is ambiguous, `inline` always asks the LLM
+    for a prose summary, `async` queues it for /summary/{job_id}.
+
+    Responses carry an ETag of the inputs the result depends on, and a
+    matching If-None-Match is answered before anything is computed: 304
+    for GET, 412 for POST (RFC 9110 only allows 304 for GET/HEAD).
+    """
+    etag = None
+    if summary != "async":
+        etag = httpcache.analysis_etag(request, export, summary, *analyzer.default_years())
+        if httpcache.etag_matches(if_none_match, etag):
+            if method == "GET":
+                return Response(status_code=304, headers=httpcache.cache_headers(etag))
+            return Response(status_code=412, headers={"ETag": etag})
+
     try:
         # Fetch historical data
-        raw_data = analyzer.fetch_historical_data(request.latitude, request.longitude)
-        df = analyzer.process_historical_data(raw_data)
-        stats = analyzer.analyze_future_date(df, request.future_date)
+        stats, sources = await compute_stats(request)
+        assessment = assess(request.activity, stats)
 
-        # interact with llm
-        summary_message = interact_llm(request.activity, stats)
+        # interact with llm, or queue it and let the client poll /summary/{job_id}
+        summary_job = None
+        if summary == "async":
+            summary_source = "llm"
+            summary_job = summary_jobs.submit(request.activity, stats, assessment)
+            if summary_job:
+                summary_message = f"Pending, fetch it from /summary/{summary_job}"
+            else:
+                summary_message = "Summary unavailable, the summary queue is full."
+        else:
+            summary_message, summary_source = await activity_summary(
+                request.activity, stats, assessment, summary)
 
         # Export format
-        if export == "json":
-            result = analyzer.export_to_json(request.latitude, request.longitude, request.future_date, stats)
-            result["llm_summary"] = summary_message
-            return JSONResponse(content=result)
+        with metrics.span("export"):
+            if export == "json":
+                result = export_json(request, stats, sources)
+                result["assessment"] = assessment
+                result["summary_source"] = summary_source
+                if summary == "async":
+                    result["llm_summary"] = None
+                    result["llm_summary_job"] = summary_job
+                else:
+                    result["llm_summary"] = summary_message
+                response = JSONResponse(content=result)
+
+            elif export == "csv":
+                csv_content = analyzer.export_to_csv(request.latitude, request.longitude, request.future_date, stats)
+                csv_content = f"# Activity Analysis\n# {summary_message}\n\n" + csv_content
+                if sources is not None:
+                    csv_content = f"# Interpolated from {len(sources)} nearby grid cells\n" + csv_content
+                response = PlainTextResponse(content=csv_content, media_type="text/csv")
+
+            else:
+                # Return report as plain text
+                report = analyzer.generate_report(request.latitude, request.longitude, request.future_date, stats)
+                final_report = f"{report}\n\n🤖 Activity Recommendation:\n{summary_message}"
+                if sources is not None:
+                    final_report = f"NOTE: Interpolated from {len(sources)} nearby grid cells.\n{final_report}"
+                response = PlainTextResponse(content=final_report, media_type="text/plain")
+    except LLMError as e:
+        raise llm_http_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Interpolated results change once the cell itself is fetched, and job ids are one-off
+    if etag is None or sources is not None:
+        response.headers["Cache-Control"] = "no-store"
+    else:
+        response.headers.update(httpcache.cache_headers(etag))
+    return response
+
+
+@app.post("/analyze")
+async def analyze_weather(request: WeatherRequest, export: str = Query("json", enum=["json", "csv", "none"]),
+                          summary: str = Query("auto", enum=["auto", "inline", "async"]),
+                          if_none_match: str | None = Header(None)):
+    """See run_analysis; a POST whose If-None-Match matches the result gets 412, use GET /analyze for 304s."""
+    return await run_analysis(request, export, summary, if_none_match, method="POST")
+
 
-        elif export == "csv":
-            csv_content = analyzer.export_to_csv(request.latitude, request.longitude, request.future_date, stats)
-            csv_content = f"# Activity Analysis\n# {summary_message}\n\n" + csv_content
-            return PlainTextResponse(content=csv_content, media_type="text/csv")
+@app.get("/analyze")
+async def analyze_weather_get(latitude: float = Query(..., ge=-90, le=90), longitude: float = Query(..., ge=-180, le=180),
+                              future_date: date = Query(...), activity: str | None = None,
+                              window_days: int = Query(0, ge=0, le=30), interpolate: bool = False,
+                              export: str = Query("json", enum=["json", "csv", "none"]),
+                              summary: str = Query("auto", enum=["auto", "inline"]),
+                              if_none_match: str | None = Header(None)):
+    """Same as POST /analyze with the request fields as query parameters, so CDNs and browsers can cache it"""
+    request = WeatherRequest(latitude=latitude, longitude=longitude, future_date=future_date, activity=activity,
+                             window_days=window_days, interpolate=interpolate)
+    return await run_analysis(request, export, summary, if_none_match)
 
+
+@app.post("/analyze/batch")
+async def analyze_weather_batch(request: BatchWeatherRequest):
+    """Analyze many locations/dates at once, fetching each grid cell only once"""
+    points = [(item.latitude, item.longitude, item.future_date, item.window_days) for item in request.items]
+    stats_list = await analyzer.analyze_many_async(points)
+
+    results = []
+    for item, stats in zip(request.items, stats_list):
+        if isinstance(stats, Exception):
+            results.append({"error": str(stats)})
         else:
-            # Return report as plain text
-            report = analyzer.generate_report(request.latitude, request.longitude, request.future_date, stats)
-            final_report = f"{report}\n\n🤖 Activity Recommendation:\n{summary_message}"
-            return PlainTextResponse(content=final_report, media_type="text/plain")
+            result = analyzer.export_to_json(item.latitude, item.longitude, item.future_date, stats)
+            result["assessment"] = assess(item.activity, stats)
+            results.append(result)
+
+    if request.llm == "deferred":
+        for result, item in zip(results, request.items):
+            if "error" not in result:
+                result["llm_summary_job"] = summary_jobs.submit(
+                    item.activity, result["statistics"], result["assessment"])
+
+    elif request.llm in ("inline", "auto"):
+        pending = [(result, item) for result, item in zip(results, request.items) if "error" not in result]
+        summaries = await asyncio.gather(*[
+            activity_summary(item.activity, result["statistics"], result["assessment"], request.llm)
+            for result, item in pending
+        ], return_exceptions=True)
+        for (result, _), outcome in zip(pending, summaries):
+            if isinstance(outcome, LLMError):
+                result["llm_summary"] = None
+                result["llm_error"] = str(outcome)
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                result["llm_summary"], result["summary_source"] = outcome
+
+    return JSONResponse(content={"count": len(results), "results": results})
+
+
+@app.post("/analyze/stream")
+async def analyze_weather_stream(request: WeatherRequest, summary: str = Query("auto", enum=["auto", "inline"])):
+    """
+    Server-Sent Events variant of /analyze: a `stats` event with the JSON
+    export as soon as it is ready, `delta` events with the summary as the
+    model writes it (or an `error` if the LLM is unavailable), then `done`.
+    With summary=auto a clear-cut verdict is sent as a single delta without
+    calling the model.
+    """
+    try:
+        stats, sources = await compute_stats(request)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    assessment = assess(request.activity, stats)
+    result = export_json(request, stats, sources)
+    result["assessment"] = assessment
+
+    async def events():
+        yield sse_event(result, "stats")
+        if summary == "auto" and assessment["verdict"] in CLEAR_VERDICTS:
+            yield sse_event({"text": summarize(assessment)}, "delta")
+        else:
+            try:
+                async for text in stream_interact_llm(request.activity, stats, assessment):
+                    yield sse_event({"text": text}, "delta")
+            except LLMError as e:
+                yield sse_event({"detail": str(e), "status": e.status_code, "retry_after": e.retry_after}, "error")
+        yield sse_event({}, "done")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.post("/analyze/best-dates")
+async def analyze_best_dates(request: BestDatesRequest):
+    """Rank the dates of a range for an activity, scoring the whole year of the location's climatology at once"""
+    try:
+        index = await analyzer.climatology_index_async(request.latitude, request.longitude)
+        ranking = analyzer.best_dates(index, request.activity, request.start_date, request.end_date,
+                                      request.top_k, request.window_days)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(content={
+        "location": {"latitude": request.latitude, "longitude": request.longitude},
+        "start_date": request.start_date.isoformat(),
+        "end_date": request.end_date.isoformat(),
+        "window_days": request.window_days,
+        **ranking,
+    })
+
+
+@app.post("/export")
+async def export_bulk(request: ExportRequest):
+    """
+    Stream the full statistics of every item, and with include_series the
+    daily series behind them, as CSV, NDJSON or columnar binary
+    """
+    extension = {"csv": "csv", "ndjson": "ndjson", "columnar": "bin"}[request.format]
+    return StreamingResponse(
+        stream_export(analyzer, request.items, request.format, request.include_series),
+        media_type=FORMATS[request.format],
+        headers={"Content-Disposition": f'attachment; filename="skyra-export.{extension}"'},
+    )
+
+
+@app.get("/summary/{job_id}")
+async def get_summary(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    """Poll a queued LLM summary; `wait` long-polls up to that many seconds"""
+    job = await summary_jobs.result(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired summary job")
+    return job
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for tuning the LLM summary cache, and the LLM queues"""
+    return {"llm_summary": summary_cache.info(), "summary_jobs": summary_jobs.info(), "llm_gateway": gateway.info()}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: latency histograms, cache hit ratios, upstream errors, in-flight requests"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 #---------------------------------------------------------------------------------------------------------------------------------
 
-SESSIONS = {}
-def get_or_create_session(session_id: str = None):
-    if not session_id or session_id not in SESSIONS:
-        session_id = str(uuid.uuid4())
-        SESSIONS[session_id] = []
-    return session_id
+sessions = create_session_store()
+# Store calls run in a thread: the SQLite backend can wait up to its busy timeout on other workers' writes
+
+async def get_or_create_session(session_id: str = None):
+    return await asyncio.to_thread(sessions.get_or_create, session_id)
+
+async def session_history(session_id: str, limit=None):
+    return await asyncio.to_thread(sessions.history, session_id, limit)
 
-def add_to_history(session_id: str, user_message: str, bot_reply: str):
-    SESSIONS[session_id].append(f"User: {user_message}")
-    SESSIONS[session_id].append(f"Bot: {bot_reply}")
-    return SESSIONS[session_id]
+async def add_to_history(session_id: str, user_message: str, bot_reply: str):
+    await asyncio.to_thread(sessions.append, session_id, f"User: {user_message}", f"Bot: {bot_reply}")
 
 @app.post("/chat")
 async def chat_with_bot(request: ChatRequest):
-    session_id = get_or_create_session(request.session_id)
+    session_id = await get_or_create_session(request.session_id)
 
-    history_text = "\n".join(SESSIONS[session_id])
+    history_text = "\n".join(await session_history(session_id, utils.SESSION_PROMPT_LINES))
 
-    bot_reply = chatbot_llm(
-        activity=request.activity,
-        weather_values=request.weather_values,
-        history=history_text,
-        user_message=request.user_message
-    )
+    try:
+        bot_reply = await chatbot_llm_async(
+            activity=request.activity,
+            weather_values=request.weather_values,
+            history=history_text,
+            user_message=request.user_message
+        )
+    except LLMError as e:
+        raise llm_http_error(e)
 
-    add_to_history(session_id, request.user_message, bot_reply)
+    await add_to_history(session_id, request.user_message, bot_reply)
 
-    return JSONResponse(content={
+    content = {
         "session_id": session_id,
         "user_message": request.user_message,
         "bot_reply": bot_reply,
-        "history": SESSIONS[session_id]
-    })
+    }
+    if request.include_history:
+        content["history"] = await session_history(session_id)
+    return JSONResponse(content=content)
+
+
+@app.post("/chat/stream")
+async def chat_with_bot_stream(request: ChatRequest):
+    """
+    Server-Sent Events variant of /chat: a `session` event, `delta` events
+    with the reply as the model writes it, then `done` with the full reply,
+    or `error` if the LLM is unavailable. The turn is added to the session
+    history once the reply is complete.
+    """
+    session_id = await get_or_create_session(request.session_id)
+    history_text = "\n".join(await session_history(session_id, utils.SESSION_PROMPT_LINES))
+
+    async def events():
+        yield sse_event({"session_id": session_id}, "session")
+        parts = []
+        try:
+            async for text in stream_chatbot_llm(
+                activity=request.activity,
+                weather_values=request.weather_values,
+                history=history_text,
+                user_message=request.user_message
+            ):
+                parts.append(text)
+                yield sse_event({"text": text}, "delta")
+        except LLMError as e:
+            # The turn is not kept, so the client can simply resend the message
+            yield sse_event({"detail": str(e), "status": e.status_code, "retry_after": e.retry_after}, "error")
+            return
+
+        bot_reply = "".join(parts).strip()
+        await add_to_history(session_id, request.user_message, bot_reply)
+        yield sse_event({"session_id": session_id, "bot_reply": bot_reply}, "done")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,277 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+
+# Seconds; covers cached lookups (sub-ms) up to slow upstream calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Metric:
+    """Base of the in-process Prometheus metrics; values are kept per label set"""
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """Yield (suffix, labels, value) for the exposition format"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", tuple(zip(self.labelnames, key)), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down; with callback, it is read at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, callback=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.callback = callback  # returns a number, or a list of (labels dict, number)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback is None:
+            yield from super().samples()
+            return
+        result = self.callback()
+        if not isinstance(result, list):
+            result = [({}, result)]
+        for labels, value in result:
+            if value is not None:
+                yield "", tuple((name, labels[name]) for name in self.labelnames), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def value(self, **labels):
+        """Return (count, sum) for a label set"""
+        entry = self._values.get(self._key(labels))
+        return (entry[2], entry[1]) if entry else (0, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in items:
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", labels + (("le", _format_value(float(bound))),), cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = Histogram(
+    "skyra_http_request_duration_seconds", "HTTP request latency, until the response body is sent",
+    ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = Gauge("skyra_http_requests_in_flight", "HTTP requests being served")
+STAGE_DURATION = Histogram("skyra_stage_duration_seconds", "Time spent in each request stage", ("stage",))
+UPSTREAM_DURATION = Histogram(
+    "skyra_upstream_request_duration_seconds", "Latency of calls to external services", ("service",))
+UPSTREAM_ERRORS = Counter("skyra_upstream_errors_total", "Failed calls to external services", ("service", "reason"))
+CACHE_LOOKUPS = Counter("skyra_cache_lookups_total", "Cache lookups by result", ("cache", "result"))
+
+
+def _cache_hit_ratios():
+    caches = sorted({key[0] for key in list(CACHE_LOOKUPS._values)})
+    ratios = []
+    for cache in caches:
+        hits = CACHE_LOOKUPS.value(cache=cache, result="hit")
+        lookups = hits + CACHE_LOOKUPS.value(cache=cache, result="miss")
+        ratios.append(({"cache": cache}, hits / lookups if lookups else None))
+    return ratios
+
+
+CACHE_HIT_RATIO = Gauge("skyra_cache_hit_ratio", "Cache hits / lookups since start", ("cache",),
+                        callback=_cache_hit_ratios)
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# Spans of the request being served, for its Server-Timing header
+_spans = ContextVar("skyra_spans", default=None)
+
+
+@contextmanager
+def span(stage):
+    """Time a block as one stage of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+@contextmanager
+def upstream(service, stage):
+    """Time a call to an external service as a request stage, counting failures"""
+    started = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    except Exception as e:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        UPSTREAM_ERRORS.inc(service=service, reason=f"http_{status}" if status else type(e).__name__)
+        raise
+    finally:
+        UPSTREAM_DURATION.observe(time.perf_counter() - started, service=service)
+
+
+def server_timing(spans, total=None):
+    """Format spans as a Server-Timing header value; repeated stages are summed"""
+    durations = {}
+    for stage, elapsed in spans:
+        durations[stage] = durations.get(stage, 0.0) + elapsed
+    entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in durations.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency and in-flight requests, and
+    adding the stages timed so far as a Server-Timing response header.
+    Stages that run after the headers go out (streamed bodies) are only
+    recorded in the stage histogram.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans = []
+        token = _spans.set(spans)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", server_timing(spans, time.perf_counter() - started))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            _spans.reset(token)
+            # Label by route template, so path parameters do not blow up the series count
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION.observe(time.perf_counter() - started,
+                                     method=scope["method"], route=route, status=str(status))
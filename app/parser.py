@@ -0,0 +1,66 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+
+POWER_FILL_VALUE = -999.0  # POWER's marker for missing values
+
+
+def parse_power_parameter(parameter, fill_value=POWER_FILL_VALUE):
+    """
+    Parse the `parameter` dict of a POWER daily JSON response into
+    contiguous float64 arrays.
+
+    POWER returns every day of the requested range in order, so only the
+    first date key is parsed and the keys are compared with the expected
+    daily sequence (cached per range); fill values become NaN. Payloads
+    with gaps or out-of-order keys fall back to parsing every key.
+
+    Returns (start_date, {parameter: array}). Raises ValueError when the
+    payload has no parameters or no dates.
+    """
+    names = list(parameter)
+    if not names:
+        raise ValueError("Empty NASA POWER response: no parameters")
+
+    keys = list(parameter[names[0]])
+    if not keys:
+        raise ValueError("Empty NASA POWER response: no dates")
+    start = datetime.strptime(keys[0], '%Y%m%d').date()
+    contiguous = keys == _daily_keys(start, len(keys)) and all(
+        list(parameter[name]) == keys for name in names[1:]
+    )
+
+    if contiguous:
+        columns = {
+            name: np.fromiter(parameter[name].values(), dtype=np.float64, count=len(keys))
+            for name in names
+        }
+    else:
+        start, columns = _parse_keys(parameter)
+
+    for column in columns.values():
+        column[column == fill_value] = np.nan
+    return start, columns
+
+
+@lru_cache(maxsize=16)
+def _daily_keys(start, n_days):
+    """The YYYYMMDD keys of n_days consecutive days from start"""
+    days = np.datetime64(start, 'D') + np.arange(n_days)
+    return [key.replace('-', '') for key in np.datetime_as_string(days).tolist()]
+
+
+def _parse_keys(parameter):
+    """Slow path: parse every date key and scatter the values into a daily range"""
+    keys = sorted(set().union(*[values.keys() for values in parameter.values()]))
+    ordinals = np.array([datetime.strptime(k, '%Y%m%d').toordinal() for k in keys])
+    start = int(ordinals[0])
+    positions = ordinals - start
+
+    columns = {}
+    for name, values in parameter.items():
+        column = np.full(int(ordinals[-1]) - start + 1, np.nan)
+        column[positions] = [values.get(k, np.nan) for k in keys]
+        columns[name] = column
+    return date.fromordinal(start), columns
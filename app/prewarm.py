@@ -0,0 +1,180 @@
+"""
+Pre-warm the NASA POWER cache for a region before switching traffic over.
+
+Examples:
+    python -m app.prewarm --bbox 29.5 30.5 31.5 32.5
+    python -m app.prewarm --bbox 20 -10 50 40 --step 1 --concurrency 4 --processes 4
+    python -m app.prewarm --points destinations.csv --state warm-state.jsonl
+
+Downloads are capped at --concurrency in flight; parsing, storing and
+validating each payload runs in a pool of --processes worker processes.
+Finished cells are appended to --state, so an interrupted run picks up
+where it stopped, and cells already in the disk cache are skipped.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app import utils
+from app.analyzer import NASAWeatherAnalyzer
+from app.spatial import GRID_LAT_STEP, GRID_LON_STEP, cell_center, snap_to_grid
+
+_worker_analyzer = None
+
+
+def _parse_and_store(latitude, longitude, start_year, end_year, content):
+    """Runs in a worker process: parse the payload, write it to the disk cache and validate it"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = NASAWeatherAnalyzer()
+    series = _worker_analyzer.store_response(latitude, longitude, start_year, end_year, content)
+    _worker_analyzer.build_climatology_index(series)
+    return series.n_days
+
+
+def _frange(start, stop, step):
+    count = int((stop - start) / step + 1e-9)
+    return [start + i * step for i in range(count + 1)]
+
+
+def bbox_cells(min_lat, min_lon, max_lat, max_lon, step=None):
+    """Return the distinct grid cells covering a bounding box, as (name, lat, lon)"""
+    lat_step = step or GRID_LAT_STEP
+    lon_step = step or GRID_LON_STEP
+    cells = {}
+    for lat in _frange(min_lat, max_lat, lat_step):
+        for lon in _frange(min_lon, max_lon, lon_step):
+            row, col = snap_to_grid(lat, lon)
+            cells.setdefault(f"{row}_{col}", cell_center(row, col))
+    return [(key, lat, lon) for key, (lat, lon) in cells.items()]
+
+
+def read_points(path):
+    """Read `name,lat,lon` or `lat,lon` rows (a header row and # comments are skipped)"""
+    points = []
+    with open(path, newline='') as f:
+        for i, row in enumerate(csv.reader(f)):
+            row = [value.strip() for value in row]
+            if not row or row[0].startswith('#'):
+                continue
+            try:
+                lat, lon = float(row[-2]), float(row[-1])
+            except (ValueError, IndexError):
+                if i == 0:
+                    continue
+                raise Exception(f"Invalid point on line {i + 1} of {path}: {row}")
+            points.append((row[0] if len(row) > 2 else f"{lat},{lon}", lat, lon))
+    return points
+
+
+def load_state(path, start_year, end_year):
+    """Return the cells a previous run finished for the same year range"""
+    done = set()
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('status') == 'ok' and entry.get('years') == [start_year, end_year]:
+                    done.add(entry['cell'])
+    return done
+
+
+async def prewarm(points, start_year=None, end_year=None, concurrency=4, processes=None, state_path=None):
+    analyzer = NASAWeatherAnalyzer()
+    start_year, end_year = analyzer.default_years(start_year, end_year)
+
+    # One job per grid cell, minus the ones finished in a previous run or already cached
+    done = load_state(state_path, start_year, end_year)
+    jobs, seen = [], set()
+    for name, lat, lon in points:
+        cell = analyzer.cache.key(lat, lon)
+        if cell in seen:
+            continue
+        seen.add(cell)
+        if cell in done or analyzer.cache.get(lat, lon, start_year, end_year) is not None:
+            continue
+        jobs.append((cell, name, lat, lon))
+    skipped = len(seen) - len(jobs)
+    print(f"{len(seen)} cells, {skipped} already warm, {len(jobs)} to fetch ({start_year}-{end_year})")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # Bound the payloads held in memory while waiting for a parser process
+    pending = asyncio.Semaphore(concurrency + 2 * (processes or os.cpu_count() or 1))
+    loop = asyncio.get_running_loop()
+    state = open(state_path, 'a') if state_path else None
+    counts = {'ok': 0, 'error': 0}
+    started = time.monotonic()
+
+    async def warm(pool, cell, name, lat, lon):
+        try:
+            async with pending:
+                async with semaphore:
+                    content = await analyzer.download_raw_async(lat, lon, start_year, end_year)
+                await loop.run_in_executor(pool, _parse_and_store, lat, lon, start_year, end_year, content)
+            status, error = 'ok', None
+        except Exception as e:
+            status, error = 'error', str(e)
+
+        counts[status] += 1
+        finished = counts['ok'] + counts['error']
+        elapsed = time.monotonic() - started
+        eta = elapsed / finished * (len(jobs) - finished)
+        print(f"[{finished}/{len(jobs)}] {name} (cell {cell}): {status}"
+              f"{f' - {error}' if error else ''} | {elapsed:.0f}s elapsed, ~{eta:.0f}s left")
+        if state:
+            state.write(json.dumps({'cell': cell, 'name': name, 'years': [start_year, end_year],
+                                    'status': status, 'error': error}) + "\n")
+            state.flush()
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+            await asyncio.gather(*[warm(pool, *job) for job in jobs])
+    finally:
+        if state:
+            state.close()
+        await analyzer.aclose()
+
+    print(f"Done: {counts['ok']} warmed, {counts['error']} failed, {skipped} skipped "
+          f"in {time.monotonic() - started:.0f}s")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-warm the NASA POWER grid-cell cache")
+    parser.add_argument('--bbox', nargs=4, type=float, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                        help="bounding box to cover")
+    parser.add_argument('--step', type=float, help="grid step in degrees for --bbox (default: every POWER cell)")
+    parser.add_argument('--points', help="CSV file of name,lat,lon or lat,lon rows")
+    parser.add_argument('--start-year', type=int, help="first year (default: same as /analyze)")
+    parser.add_argument('--end-year', type=int, help="last year (default: same as /analyze)")
+    parser.add_argument('--concurrency', type=int, default=4, help="max downloads in flight (default: 4)")
+    parser.add_argument('--processes', type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument('--state', default=os.path.join(utils.CACHE_DIR, 'prewarm-state.jsonl'),
+                        help="progress file used to resume interrupted runs")
+    args = parser.parse_args(argv)
+
+    points = []
+    if args.bbox:
+        points += bbox_cells(*args.bbox, step=args.step)
+    if args.points:
+        points += read_points(args.points)
+    if not points:
+        parser.error("give --bbox and/or --points")
+
+    if os.path.dirname(args.state):
+        os.makedirs(os.path.dirname(args.state), exist_ok=True)
+    counts = asyncio.run(prewarm(points, args.start_year, args.end_year, args.concurrency,
+                                 args.processes, args.state))
+    return 1 if counts['error'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
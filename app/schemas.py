@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 from datetime import date
@@ -8,6 +8,27 @@ class WeatherRequest(BaseModel):
     longitude: float = Field(..., ge=-180, le=180)
     future_date: date
     activity: str | None = None
+    window_days: int = Field(0, ge=0, le=30)  # pool observations from +/-N days around the date
+    interpolate: bool = False  # answer from nearby cached cells if this one is not cached yet
+
+class BatchWeatherRequest(BaseModel):
+    items: list[WeatherRequest] = Field(..., min_length=1, max_length=200)
+    # per-item activity summary: auto uses the rule verdict unless it is ambiguous, deferred ones go to /summary/{id}
+    llm: Literal["skip", "auto", "inline", "deferred"] = "skip"
+
+class BestDatesRequest(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    activity: str
+    start_date: date
+    end_date: date  # at most a year after start_date
+    top_k: int = Field(5, ge=1, le=50)
+    window_days: int = Field(0, ge=0, le=30)
+
+class ExportRequest(BaseModel):
+    items: list[WeatherRequest] = Field(..., min_length=1, max_length=1000)
+    format: Literal["csv", "ndjson", "columnar"] = "csv"
+    include_series: bool = False  # also stream the daily series behind the stats
 
 class ExportResponse(BaseModel):
     filename: str
@@ -18,3 +39,4 @@ class ChatRequest(BaseModel):
     activity: str | None = None
     weather_values: dict | None = None
     session_id: Optional[str] = None
+    include_history: bool = True  # False returns only the new turn
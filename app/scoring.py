@@ -0,0 +1,332 @@
+import re
+
+import numpy as np
+
+from app import utils
+
+# Stats fields the profiles look at, in feature-matrix column order
+FEATURES = (
+    'temperature.avg_celsius',
+    'temperature.very_hot_prob',
+    'temperature.very_cold_prob',
+    'rain.rainy_day_prob',
+    'rain.heavy_rain_prob',
+    'wind.very_windy_prob',
+    'wind.extreme_wind_prob',
+    'specific_humidity.high_humidity_prob',
+    'comfort.very_uncomfortable_prob',
+)
+_AVG_TEMP = FEATURES.index('temperature.avg_celsius')
+
+_LABELS = {
+    'temperature.avg_celsius': "average temperature",
+    'temperature.very_hot_prob': "very hot days (>32°C)",
+    'temperature.very_cold_prob': "freezing days (<0°C)",
+    'rain.rainy_day_prob': "rainy days",
+    'rain.heavy_rain_prob': "heavy rain (>10 mm)",
+    'wind.very_windy_prob': "windy days (>10 mph)",
+    'wind.extreme_wind_prob': "strong wind (>15 mph)",
+    'specific_humidity.high_humidity_prob': "very humid days",
+    'comfort.very_uncomfortable_prob': "very uncomfortable days",
+}
+
+# Per-activity thresholds.
+#   temperature: (comfortable min °C, comfortable max °C, tolerance °C, weight)
+#     the penalty grows linearly to its full weight `tolerance` degrees
+#     outside the comfortable range of the average temperature
+#   limits: feature -> (ok, bad, weight), the penalty grows linearly from 0
+#     at `ok` to `weight` at `bad` (bad < ok penalizes low values instead)
+# The score is 100 * product of (1 - penalty), so one severe factor is
+# enough to sink it.
+PROFILES = {
+    'hiking': {
+        'aliases': ('hike', 'hikes', 'trek', 'trekking', 'trail', 'walking', 'climbing'),
+        'temperature': (5, 25, 10, 0.8),
+        'limits': {
+            'rain.heavy_rain_prob': (10, 40, 0.9),
+            'rain.rainy_day_prob': (40, 85, 0.4),
+            'temperature.very_hot_prob': (5, 40, 0.8),
+            'wind.extreme_wind_prob': (10, 40, 0.6),
+            'comfort.very_uncomfortable_prob': (15, 60, 0.5),
+        },
+    },
+    'running': {
+        'aliases': ('run', 'jogging', 'jog', 'marathon'),
+        'temperature': (5, 20, 10, 0.7),
+        'limits': {
+            'temperature.very_hot_prob': (5, 30, 0.9),
+            'rain.heavy_rain_prob': (15, 50, 0.6),
+            'comfort.very_uncomfortable_prob': (10, 50, 0.7),
+            'wind.extreme_wind_prob': (15, 50, 0.4),
+        },
+    },
+    'cycling': {
+        'aliases': ('bike', 'biking', 'bicycle', 'cycle', 'mountain biking'),
+        'temperature': (8, 26, 10, 0.7),
+        'limits': {
+            'rain.heavy_rain_prob': (10, 35, 0.8),
+            'wind.very_windy_prob': (30, 80, 0.6),
+            'wind.extreme_wind_prob': (5, 30, 0.8),
+            'temperature.very_hot_prob': (10, 40, 0.6),
+        },
+    },
+    'swimming': {
+        'aliases': ('swim', 'pool', 'snorkeling', 'diving', 'scuba'),
+        'temperature': (24, 34, 8, 0.9),
+        'limits': {
+            'temperature.very_cold_prob': (0, 5, 1.0),
+            'rain.heavy_rain_prob': (10, 40, 0.6),
+            'wind.extreme_wind_prob': (10, 40, 0.5),
+        },
+    },
+    'beach day': {
+        'aliases': ('beach', 'sunbathing', 'surfing', 'surf'),
+        'temperature': (22, 33, 8, 0.9),
+        'limits': {
+            'rain.rainy_day_prob': (30, 75, 0.7),
+            'rain.heavy_rain_prob': (5, 30, 0.8),
+            'wind.extreme_wind_prob': (10, 40, 0.6),
+            'temperature.very_cold_prob': (0, 5, 1.0),
+        },
+    },
+    'picnic': {
+        'aliases': ('barbecue', 'bbq', 'park', 'outdoor lunch'),
+        'temperature': (15, 28, 8, 0.8),
+        'limits': {
+            'rain.rainy_day_prob': (25, 70, 0.8),
+            'rain.heavy_rain_prob': (5, 30, 0.8),
+            'wind.very_windy_prob': (40, 90, 0.5),
+            'temperature.very_hot_prob': (10, 40, 0.6),
+        },
+    },
+    'camping': {
+        'aliases': ('camp', 'tent', 'glamping'),
+        'temperature': (8, 26, 10, 0.7),
+        'limits': {
+            'rain.heavy_rain_prob': (10, 35, 0.9),
+            'wind.extreme_wind_prob': (10, 35, 0.8),
+            'temperature.very_cold_prob': (5, 40, 0.7),
+        },
+    },
+    'fishing': {
+        'aliases': ('fish', 'angling'),
+        'temperature': (3, 30, 10, 0.5),
+        'limits': {
+            'rain.heavy_rain_prob': (15, 50, 0.6),
+            'wind.extreme_wind_prob': (5, 30, 0.9),
+            'wind.very_windy_prob': (40, 90, 0.5),
+        },
+    },
+    'boating': {
+        'aliases': ('boat', 'sailing', 'kayaking', 'kayak', 'canoeing', 'rowing', 'paddleboarding'),
+        'temperature': (12, 32, 10, 0.6),
+        'limits': {
+            'wind.extreme_wind_prob': (5, 25, 1.0),
+            'wind.very_windy_prob': (40, 90, 0.5),
+            'rain.heavy_rain_prob': (10, 40, 0.6),
+        },
+    },
+    'skiing': {
+        'aliases': ('ski', 'snowboarding', 'snowboard', 'snowshoeing'),
+        'temperature': (-15, 2, 6, 1.0),
+        'limits': {
+            'rain.heavy_rain_prob': (10, 40, 0.5),
+            'wind.extreme_wind_prob': (10, 40, 0.7),
+        },
+    },
+    'sightseeing': {
+        'aliases': ('city tour', 'walking tour', 'tour', 'tourism', 'photography', 'shopping'),
+        'temperature': (5, 30, 10, 0.6),
+        'limits': {
+            'rain.heavy_rain_prob': (15, 50, 0.6),
+            'rain.rainy_day_prob': (50, 95, 0.3),
+            'temperature.very_hot_prob': (15, 50, 0.6),
+        },
+    },
+    'outdoor sports': {
+        'aliases': ('football', 'soccer', 'tennis', 'golf', 'basketball', 'cricket', 'baseball', 'volleyball'),
+        'temperature': (10, 28, 10, 0.7),
+        'limits': {
+            'rain.heavy_rain_prob': (10, 40, 0.8),
+            'temperature.very_hot_prob': (5, 35, 0.8),
+            'comfort.very_uncomfortable_prob': (15, 50, 0.6),
+            'wind.very_windy_prob': (40, 90, 0.4),
+        },
+    },
+    'stargazing': {
+        'aliases': ('astronomy', 'star gazing', 'night sky', 'astrophotography'),
+        'temperature': (-5, 30, 10, 0.4),
+        'limits': {
+            'rain.rainy_day_prob': (20, 60, 0.9),
+            'specific_humidity.high_humidity_prob': (30, 80, 0.4),
+        },
+    },
+}
+
+CLEAR_VERDICTS = ('suitable', 'unsuitable')
+
+
+def _lookup(stats, path):
+    value = stats
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return np.nan
+        value = value[part]
+    return float(value) if isinstance(value, (int, float, np.number)) and not isinstance(value, bool) else np.nan
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z ]", " ", (text or "").lower())).strip()
+
+
+class ActivityScorer:
+    """
+    Rule-based activity suitability. The profiles are compiled into
+    (activity x feature) threshold matrices, so every activity is scored
+    against a stats dict, or against a whole feature matrix, in one
+    vectorized pass.
+    """
+
+    def __init__(self, profiles=None):
+        profiles = profiles if profiles is not None else PROFILES
+        self.activities = list(profiles)
+        n, f = len(self.activities), len(FEATURES)
+        self.ok = np.zeros((n, f))
+        self.bad = np.ones((n, f))
+        self.weight = np.zeros((n, f))
+        self.temperature = np.tile([np.nan, np.nan, 1.0, 0.0], (n, 1))  # min, max, tolerance, weight
+
+        aliases = []
+        for i, (name, profile) in enumerate(profiles.items()):
+            for feature, (ok, bad, weight) in profile.get('limits', {}).items():
+                j = FEATURES.index(feature)
+                self.ok[i, j], self.bad[i, j], self.weight[i, j] = ok, bad, weight
+            if 'temperature' in profile:
+                self.temperature[i] = profile['temperature']
+            aliases += [(_normalize(alias), name) for alias in (name, *profile.get('aliases', ()))]
+        # (activity x feature) True where the profile gives the feature a weight
+        self.weighted = self.weight > 0
+        self.weighted[:, _AVG_TEMP] = self.temperature[:, 3] > 0
+        # Longest first, so "walking tour" wins over "walking"
+        self._aliases = sorted(aliases, key=lambda item: -len(item[0]))
+
+    def match(self, activity):
+        """Return the profile name for free-text activity, or None when it is unknown"""
+        text = f" {_normalize(activity)} "
+        for alias, name in self._aliases:
+            if f" {alias} " in text:
+                return name
+        return None
+
+    @staticmethod
+    def features(stats):
+        """Feature vector of a stats dict; NaN where a field is missing"""
+        return np.array([_lookup(stats, path) for path in FEATURES], dtype=np.float64)
+
+    def score_matrix(self, features):
+        """
+        Score feature rows against every activity at once.
+
+        features: (rows, len(FEATURES)) array, or a single row
+        Returns (scores, penalties): scores are (rows, activities) in
+        0-100, penalties (rows, activities, len(FEATURES)) hold each
+        factor's weighted penalty. Missing features do not penalize, so
+        check missing() before trusting a score.
+        """
+        x = np.atleast_2d(np.asarray(features, dtype=np.float64))[:, None, :]
+        with np.errstate(invalid='ignore'):
+            penalties = self.weight * np.clip((x - self.ok) / (self.bad - self.ok), 0, 1)
+
+            low, high, tolerance, weight = self.temperature.T
+            temps = x[:, :, _AVG_TEMP]
+            gap = np.fmax(np.fmax(low - temps, temps - high), 0)
+            penalties[:, :, _AVG_TEMP] = weight * np.clip(gap / tolerance, 0, 1)
+
+        penalties = np.nan_to_num(penalties, nan=0.0)
+        scores = 100 * np.prod(1 - penalties, axis=2)
+        return scores, penalties
+
+    def missing(self, features):
+        """(rows, activities) bool array: True where a feature the activity's profile weighs is missing"""
+        x = np.atleast_2d(np.asarray(features, dtype=np.float64))[:, None, :]
+        return (np.isnan(x) & self.weighted).any(axis=2)
+
+    def verdict(self, score, missing=False):
+        """A score from incomplete data is never clear-cut, so it stays 'ambiguous' for the LLM to weigh"""
+        if missing:
+            return 'ambiguous'
+        if score >= utils.SCORE_SUITABLE_MIN:
+            return 'suitable'
+        if score <= utils.SCORE_UNSUITABLE_MAX:
+            return 'unsuitable'
+        return 'ambiguous'
+
+    def assess(self, activity, stats, alternatives=3):
+        """
+        Verdict for the activity plus the best-scoring alternatives.
+
+        The verdict is 'suitable', 'unsuitable', 'ambiguous' (a judgement
+        call, left to the LLM) or 'unknown' (no profile for the activity).
+        Missing data for a factor the profile weighs gives no score and an
+        'ambiguous' verdict, whatever the remaining factors look like.
+        """
+        features = self.features(stats)
+        scores, penalties = self.score_matrix(features)
+        scores, penalties, missing = scores[0], penalties[0], self.missing(features)[0]
+        name = self.match(activity)
+
+        assessment = {'activity': name, 'score': None, 'verdict': 'unknown', 'reasons': []}
+        floor = utils.SCORE_UNSUITABLE_MAX
+        if name is not None:
+            i = self.activities.index(name)
+            assessment['verdict'] = self.verdict(scores[i], missing[i])
+            assessment['reasons'] = self.reasons(name, features, penalties[i])
+            if missing[i]:
+                assessment['reasons'].insert(0, "no data for " + ", ".join(self.missing_labels(name, features)))
+            else:
+                assessment['score'] = round(float(scores[i]), 1)
+                floor = max(floor, scores[i])
+
+        assessment['alternatives'] = [
+            {'activity': self.activities[k], 'score': round(float(scores[k]), 1)}
+            for k in np.argsort(-scores, kind='stable')
+            if self.activities[k] != name and scores[k] > floor and not missing[k]
+        ][:alternatives]
+        return assessment
+
+    def missing_labels(self, name, features):
+        """Labels of the features the activity weighs that are missing"""
+        i = self.activities.index(name)
+        return [_LABELS[FEATURES[j]] for j in np.flatnonzero(np.isnan(features) & self.weighted[i])]
+
+    def reasons(self, name, features, penalties, limit=3):
+        """Describe the factors that cost an activity the most, worst first"""
+        return [
+            self._reason(name, j, features[j])
+            for j in np.argsort(-penalties, kind='stable')[:limit]
+            if penalties[j] >= 0.05
+        ]
+
+    def _reason(self, name, j, value):
+        feature = FEATURES[j]
+        if j == _AVG_TEMP:
+            low, high = self.temperature[self.activities.index(name), :2]
+            return f"average {value:.1f}°C, outside the comfortable {low:g} to {high:g}°C"
+        return f"{_LABELS.get(feature, feature)} in {value:.0f}% of past years"
+
+
+scorer = ActivityScorer()
+
+
+def summarize(assessment):
+    """Plain-text summary of a clear-cut assessment, used instead of an LLM call"""
+    activity = assessment['activity'].capitalize()
+    text = f"{activity} looks {assessment['verdict']} for this date (score {assessment['score']:.0f}/100)"
+    if assessment['reasons']:
+        lead = "Watch out for" if assessment['verdict'] == 'suitable' else "Mainly because of"
+        text += f". {lead}: " + "; ".join(assessment['reasons'])
+    text += "."
+    if assessment['verdict'] == 'unsuitable' and assessment['alternatives']:
+        text += " Better options: " + ", ".join(
+            f"{alt['activity']} ({alt['score']:.0f}/100)" for alt in assessment['alternatives']) + "."
+    return text
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from app import utils
+
+
+class SessionStore(ABC):
+    """
+    Chat session history with an idle TTL, a cap on the number of
+    sessions (the least recently used are evicted first) and a cap on the
+    lines kept per session (the oldest are dropped on append).
+
+    Each turn is appended in O(1) and prompts only read the most recent
+    `limit` lines, so per-turn cost stays flat as conversations grow.
+    """
+
+    def __init__(self, max_sessions=None, idle_ttl=None, max_lines=None):
+        self.max_sessions = max_sessions if max_sessions is not None else utils.SESSION_MAX
+        self.idle_ttl = idle_ttl if idle_ttl is not None else utils.SESSION_IDLE_TTL
+        self.max_lines = max_lines if max_lines is not None else utils.SESSION_MAX_LINES
+        if self.max_lines < 1:
+            raise ValueError(f"max_lines must be at least 1, got {self.max_lines}")
+
+    def get_or_create(self, session_id=None):
+        """Return session_id if it is still alive, otherwise the id of a new session"""
+        if session_id and self.touch(session_id):
+            return session_id
+        session_id = str(uuid.uuid4())
+        self.create(session_id)
+        return session_id
+
+    @abstractmethod
+    def touch(self, session_id):
+        """Mark the session as used now; False if it does not exist or expired"""
+
+    @abstractmethod
+    def create(self, session_id):
+        """Start an empty session"""
+
+    @abstractmethod
+    def append(self, session_id, *lines):
+        """Add lines to a live session, dropping its oldest beyond max_lines"""
+
+    @abstractmethod
+    def history(self, session_id, limit=None):
+        """Return the session's lines, only the last `limit` ones if given"""
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions held in this process only"""
+
+    def __init__(self, max_sessions=None, idle_ttl=None, max_lines=None):
+        super().__init__(max_sessions, idle_ttl, max_lines)
+        self._sessions = OrderedDict()  # id -> (last_seen, lines), oldest first
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._sessions:
+            session_id, (last_seen, _) = next(iter(self._sessions.items()))
+            if now - last_seen <= self.idle_ttl and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def touch(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if session_id not in self._sessions:
+                return False
+            self._sessions[session_id] = (now, self._sessions[session_id][1])
+            self._sessions.move_to_end(session_id)
+            return True
+
+    def create(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (now, [])
+            self._expire(now)
+
+    def append(self, session_id, *lines):
+        with self._lock:
+            if session_id in self._sessions:
+                history = self._sessions[session_id][1]
+                history.extend(lines)
+                del history[:-self.max_lines]
+
+    def history(self, session_id, limit=None):
+        with self._lock:
+            if session_id not in self._sessions:
+                return []
+            lines = self._sessions[session_id][1]
+            return list(lines[-limit:] if limit else lines)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Sessions in a local SQLite file, so they survive restarts and are
+    shared by every uvicorn worker on the host.
+    """
+
+    def __init__(self, path=None, max_sessions=None, idle_ttl=None, max_lines=None):
+        super().__init__(max_sessions, idle_ttl, max_lines)
+        self.path = path if path is not None else utils.SESSION_SQLITE_PATH
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, last_seen REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS lines ("
+                "session_id TEXT NOT NULL, seq INTEGER PRIMARY KEY AUTOINCREMENT, line TEXT NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS lines_session ON lines (session_id, seq)")
+
+    def _expire(self, now):
+        expired = "SELECT id FROM sessions WHERE last_seen < ?"
+        overflow = "SELECT id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?"
+        self._conn.execute(f"DELETE FROM lines WHERE session_id IN ({expired})", (now - self.idle_ttl,))
+        self._conn.execute(f"DELETE FROM sessions WHERE id IN ({expired})", (now - self.idle_ttl,))
+        self._conn.execute(f"DELETE FROM lines WHERE session_id IN ({overflow})", (self.max_sessions,))
+        self._conn.execute(f"DELETE FROM sessions WHERE id IN ({overflow})", (self.max_sessions,))
+
+    def touch(self, session_id):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE sessions SET last_seen = ? WHERE id = ? AND last_seen >= ?",
+                (now, session_id, now - self.idle_ttl))
+            return cursor.rowcount > 0
+
+    def create(self, session_id):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("INSERT OR REPLACE INTO sessions (id, last_seen) VALUES (?, ?)", (session_id, now))
+                self._expire(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def append(self, session_id, *lines):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO lines (session_id, line) SELECT ?, ? WHERE EXISTS (SELECT 1 FROM sessions WHERE id = ?)",
+                    [(session_id, line, session_id) for line in lines])
+                self._conn.execute(
+                    "DELETE FROM lines WHERE session_id = ? AND seq <= "
+                    "(SELECT seq FROM lines WHERE session_id = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                    (session_id, session_id, self.max_lines))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def history(self, session_id, limit=None):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT line FROM (SELECT seq, line FROM lines WHERE session_id = ? ORDER BY seq DESC LIMIT ?) "
+                "ORDER BY seq",
+                (session_id, limit if limit else -1)).fetchall()
+        return [row[0] for row in rows]
+
+
+def create_session_store(backend=None):
+    backend = backend or utils.SESSION_BACKEND
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SqliteSessionStore()
+    raise Exception(f"Unknown session backend: {backend}")
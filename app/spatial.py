@@ -0,0 +1,106 @@
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0
+
+# NASA POWER meteorology (MERRA-2) grid: 0.5° latitude x 0.625° longitude
+GRID_LAT_STEP = 0.5
+GRID_LON_STEP = 0.625
+GRID_LON_CELLS = int(round(360 / GRID_LON_STEP))
+
+
+def snap_to_grid(latitude, longitude):
+    """Return the (row, col) of the POWER grid cell containing the point"""
+    row = int(round((latitude + 90) / GRID_LAT_STEP))
+    col = int(round((longitude + 180) / GRID_LON_STEP)) % GRID_LON_CELLS
+    return row, col
+
+
+def cell_center(row, col):
+    """Return the (latitude, longitude) of a grid cell center"""
+    return -90 + row * GRID_LAT_STEP, -180 + col * GRID_LON_STEP
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class CellGrid:
+    """
+    Grid hash of the POWER cells held in a store. Cells are already on a
+    regular grid, so a neighbor search only visits the few rows and columns
+    that can fall within the radius.
+    """
+
+    def __init__(self):
+        self._cells = set()  # (row, col)
+        self._lock = threading.Lock()
+
+    def add(self, row, col):
+        with self._lock:
+            self._cells.add((row, col))
+
+    def discard(self, row, col):
+        with self._lock:
+            self._cells.discard((row, col))
+
+    def __contains__(self, cell):
+        return cell in self._cells
+
+    def cells(self):
+        with self._lock:
+            return list(self._cells)
+
+    def __len__(self):
+        return len(self._cells)
+
+    def nearest(self, latitude, longitude, radius_km, k=4):
+        """Return up to k (distance_km, row, col) of stored cells within radius_km, closest first"""
+        row0, col0 = snap_to_grid(latitude, longitude)
+        km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+        row_span = int(math.ceil(radius_km / (km_per_degree * GRID_LAT_STEP)))
+        cos_lat = max(math.cos(math.radians(min(abs(latitude) + row_span * GRID_LAT_STEP, 90))), 1e-6)
+        col_span = min(int(math.ceil(radius_km / (km_per_degree * cos_lat * GRID_LON_STEP))), GRID_LON_CELLS // 2)
+
+        found = []
+        with self._lock:
+            for row in range(row0 - row_span, row0 + row_span + 1):
+                for col in range(col0 - col_span, col0 + col_span + 1):
+                    cell = (row, col % GRID_LON_CELLS)
+                    if cell not in self._cells:
+                        continue
+                    distance = haversine_km(latitude, longitude, *cell_center(*cell))
+                    if distance <= radius_km:
+                        found.append((distance, *cell))
+        found.sort()
+        return found[:k]
+
+
+def idw_weights(distances, power=2):
+    """Inverse-distance weights summing to 1; an exact hit takes all the weight"""
+    if any(d < 1e-6 for d in distances):
+        return [1.0 if d < 1e-6 else 0.0 for d in distances]
+    raw = [1 / d ** power for d in distances]
+    total = sum(raw)
+    return [w / total for w in raw]
+
+
+def interpolate_stats(stats_list, weights):
+    """Weighted average of the numeric leaves of several stats dicts with the same layout"""
+    first = stats_list[0]
+    result = {}
+    for key, value in first.items():
+        if isinstance(value, dict):
+            result[key] = interpolate_stats([s[key] for s in stats_list], weights)
+            continue
+        values = [(s.get(key), w) for s, w in zip(stats_list, weights)]
+        values = [(v, w) for v, w in values if isinstance(v, (int, float))]
+        if not values:
+            result[key] = None
+            continue
+        total = sum(w for _, w in values)
+        mean = sum(v * w for v, w in values) / total if total else values[0][0]
+        result[key] = int(round(mean)) if isinstance(value, int) else round(mean, 2)
+    return result
@@ -0,0 +1,158 @@
+import mmap
+import os
+import struct
+import time
+from datetime import date
+
+import numpy as np
+
+from app.parser import parse_power_parameter
+
+# On-disk layout of a grid cell's daily series (little endian):
+#   header  magic, version, n_vars, decimals, n_days, start date ordinal,
+#           start_year, end_year, then n_vars 16-byte variable names,
+#           zero-padded to a multiple of 64 bytes
+#   body    one contiguous float32 column per variable, n_days values each,
+#           NaN where the value is missing
+MAGIC = b"SKYRAPWS"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHHxxIIHH")
+_NAME_SIZE = 16
+_ALIGN = 64
+
+# The parameters NASAWeatherAnalyzer requests, in storage order
+VARIABLES = ('T2M', 'QV2M', 'U10M', 'PS', 'PRECTOTCORR')
+POWER_DECIMALS = 2  # POWER reports daily values with two decimals
+
+
+class PowerSeries:
+    """
+    Daily NASA POWER series of one grid cell: float32 columns sharing a
+    contiguous date range starting at start_date.
+
+    Columns are either in-memory arrays or zero-copy views of a mmap'ed
+    file, so every worker process reading the same file shares its pages.
+    """
+
+    def __init__(self, start_date, columns, start_year, end_year, decimals=POWER_DECIMALS, _mmap=None):
+        self.start_date = start_date
+        self.columns = columns  # variable -> float32 array
+        self.start_year = start_year
+        self.end_year = end_year
+        self.decimals = decimals
+        self.fetched_at = time.time()  # when the data was downloaded; a file's mtime once stored
+        self._mmap = _mmap
+
+    @property
+    def variables(self):
+        return list(self.columns)
+
+    @property
+    def n_days(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def column(self, name):
+        """Return a float64 copy of a column, rounded back to the source precision"""
+        return np.round(self.columns[name].astype(np.float64), self.decimals)
+
+    def dates(self):
+        return np.datetime64(self.start_date, 'D') + np.arange(self.n_days)
+
+    @classmethod
+    def from_parameter(cls, parameter, start_year, end_year):
+        """Build a series from the `parameter` dict of a POWER JSON response"""
+        start, parsed = parse_power_parameter(parameter)
+        names = [v for v in VARIABLES if v in parsed] + [v for v in parsed if v not in VARIABLES]
+        columns = {name: parsed[name].astype(np.float32) for name in names}
+        return cls(start, columns, start_year, end_year)
+
+
+    def has_trailing_gap(self):
+        """True when the last day is missing in any column"""
+        return any(np.isnan(column[-1]) for column in self.columns.values()) if self.n_days else True
+
+    def slice_years(self, start_year, end_year):
+        """Return the part of the series within start_year..end_year (views, no copy)"""
+        first = max((date(start_year, 1, 1) - self.start_date).days, 0)
+        stop = max(min((date(end_year, 12, 31) - self.start_date).days + 1, self.n_days), first)
+        columns = {name: column[first:stop] for name, column in self.columns.items()}
+        start = date.fromordinal(self.start_date.toordinal() + first)
+        part = PowerSeries(start, columns, start_year, end_year, self.decimals)
+        part.fetched_at = self.fetched_at
+        return part
+
+    def append(self, other):
+        """Return a new series with other's days after this one's, NaN-filling any gap"""
+        gap = (other.start_date - self.start_date).days - self.n_days
+        if gap < 0:
+            raise ValueError("Appended series overlaps the existing one")
+        columns = {}
+        for name, column in self.columns.items():
+            tail = other.columns.get(name)
+            if tail is None:
+                tail = np.full(other.n_days, np.nan, dtype=np.float32)
+            columns[name] = np.concatenate([column, np.full(gap, np.nan, dtype=np.float32), tail]).astype(np.float32)
+        return PowerSeries(self.start_date, columns, self.start_year, other.end_year, self.decimals)
+
+
+def header_bytes(series):
+    """Return the file header of a series, including the alignment padding"""
+    names = b"".join(name.encode('ascii')[:_NAME_SIZE].ljust(_NAME_SIZE, b"\0") for name in series.variables)
+    header = _HEADER.pack(MAGIC, VERSION, len(series.variables), series.decimals, series.n_days,
+                          series.start_date.toordinal(), series.start_year, series.end_year) + names
+    return header.ljust(-(-len(header) // _ALIGN) * _ALIGN, b"\0")
+
+
+def write_series(path, series):
+    """Write a series atomically, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header_bytes(series))
+        for name in series.variables:
+            f.write(np.ascontiguousarray(series.columns[name], dtype='<f4').tobytes())
+    os.replace(tmp_path, path)
+
+
+def _parse_series(buffer, name, _mmap=None):
+    """Build a PowerSeries whose columns are views of buffer (a mmap or bytes)"""
+    magic, version, n_vars, decimals, n_days, start, start_year, end_year = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a series file: {name}")
+
+    names_offset = _HEADER.size
+    variables = [
+        bytes(buffer[names_offset + i * _NAME_SIZE:names_offset + (i + 1) * _NAME_SIZE]).rstrip(b"\0").decode('ascii')
+        for i in range(n_vars)
+    ]
+    offset = -(-(names_offset + n_vars * _NAME_SIZE) // _ALIGN) * _ALIGN
+    if len(buffer) < offset + n_vars * n_days * 4:
+        raise ValueError(f"Truncated series file: {name}")
+
+    columns = {}
+    for i, variable in enumerate(variables):
+        columns[variable] = np.frombuffer(buffer, dtype='<f4', count=n_days, offset=offset + i * n_days * 4)
+    return PowerSeries(date.fromordinal(start), columns, start_year, end_year, decimals, _mmap=_mmap)
+
+
+def series_nbytes(series):
+    """Size of a series in the file format: header plus float32 columns"""
+    return len(header_bytes(series)) + len(series.variables) * series.n_days * 4
+
+
+def series_from_bytes(data):
+    """Read a series from the bytes of a series file (e.g. a columnar export frame)"""
+    return _parse_series(data, "<bytes>")
+
+
+def open_series(path):
+    """Open a series file with mmap; columns are read-only views of the mapping"""
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        fetched_at = os.fstat(f.fileno()).st_mtime
+    try:
+        series = _parse_series(mapped, path, _mmap=mapped)
+    except Exception:
+        mapped.close()
+        raise
+    series.fetched_at = fetched_at
+    return series
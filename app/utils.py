@@ -0,0 +1,70 @@
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# NASA POWER historical data cache
+CACHE_DIR = os.getenv("POWER_CACHE_DIR", ".cache/power")
+CACHE_MEMORY_ENTRIES = int(os.getenv("POWER_CACHE_MEMORY_ENTRIES", "256"))  # parsed series kept in RAM
+CACHE_DISK_MAX_MB = float(os.getenv("POWER_CACHE_DISK_MAX_MB", "512"))  # 0 disables the disk cache
+POWER_GAP_REFRESH = float(os.getenv("POWER_GAP_REFRESH", "86400"))  # seconds before re-fetching a year POWER had not published fully
+INDEX_MEMORY_ENTRIES = int(os.getenv("INDEX_MEMORY_ENTRIES", "256"))  # precomputed climatology indexes kept in RAM
+INDEX_MEMORY_MB = float(os.getenv("INDEX_MEMORY_MB", "64"))  # ... and their total size per worker
+
+# Nearby-cell interpolation for uncached cells (WeatherRequest.interpolate)
+INTERPOLATION_RADIUS_KM = float(os.getenv("INTERPOLATION_RADIUS_KM", "100"))
+INTERPOLATION_NEIGHBORS = int(os.getenv("INTERPOLATION_NEIGHBORS", "4"))
+
+# Rule-based activity scores (0-100): at or above suitable / at or below unsuitable skip the LLM
+SCORE_SUITABLE_MIN = float(os.getenv("SCORE_SUITABLE_MIN", "70"))
+SCORE_UNSUITABLE_MAX = float(os.getenv("SCORE_UNSUITABLE_MAX", "35"))
+
+# HTTP caching of /analyze responses (ETag + Cache-Control)
+ANALYZE_CACHE_MAX_AGE = int(os.getenv("ANALYZE_CACHE_MAX_AGE", "3600"))  # seconds
+
+# Upstream HTTP
+POWER_BASE_URL = os.getenv("POWER_BASE_URL", "https://power.larc.nasa.gov/api/temporal/daily/point")
+POWER_TIMEOUT = float(os.getenv("POWER_TIMEOUT", "60"))  # seconds
+POWER_MAX_CONCURRENCY = int(os.getenv("POWER_MAX_CONCURRENCY", "8"))  # downloads in flight, keep <= HTTP_MAX_CONNECTIONS
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+
+# LLM gateway (app/gateway.py): one shared client, bounded concurrency, deadlines and retries
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # calls in flight to the provider
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))  # calls waiting for a slot before new ones are shed
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # seconds per call, queueing and retries included
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))  # extra attempts after a transient error
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))  # seconds, doubled per attempt, with jitter
+LLM_RETRY_AFTER = int(os.getenv("LLM_RETRY_AFTER", "5"))  # Retry-After (seconds) sent with shed requests
+LLM_WARMUP = os.getenv("LLM_WARMUP", "0") == "1"  # load the Gemini SDK in the background at startup, not on first use
+
+# Background LLM summary jobs (/analyze?summary=async)
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+SUMMARY_QUEUE_SIZE = int(os.getenv("SUMMARY_QUEUE_SIZE", "100"))  # waiting jobs before new ones are rejected
+SUMMARY_JOB_TTL = float(os.getenv("SUMMARY_JOB_TTL", "600"))  # seconds a finished job can be fetched
+SUMMARY_JOB_MAX = int(os.getenv("SUMMARY_JOB_MAX", "10000"))
+
+# Chat sessions
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory" or "sqlite"
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", ".cache/sessions.sqlite3")
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "3600"))  # seconds without a message before a session expires
+SESSION_MAX_LINES = int(os.getenv("SESSION_MAX_LINES", "200"))  # history lines kept per session, oldest dropped first
+SESSION_PROMPT_LINES = int(os.getenv("SESSION_PROMPT_LINES", "20"))  # most recent history lines sent to the LLM
+
+# LLM summary cache: stats are rounded to these bucket sizes (by field suffix) before keying
+LLM_CACHE_ENTRIES = int(os.getenv("LLM_CACHE_ENTRIES", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))  # seconds, 0 disables the cache
+LLM_CACHE_BUCKETS = {
+    "prob": 10,  # %
+    "celsius": 2,
+    "mm": 2,
+    "g_kg": 2,
+    "ms": 1,
+    "mph": 2,
+    "kpa": 0.5,
+    "mb": 5,
+    **json.loads(os.getenv("LLM_CACHE_BUCKETS", "{}")),
+}
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the Skyra API that run without network access.
+
+    python -m bench.load      # concurrent load test of /analyze and /chat
+    python -m bench.micro     # micro-benchmarks of the analysis code
+    python -m bench.startup   # import time of app.main against a target
+    python -m bench.compare bench/results/micro-old.json bench/results/micro.json
+"""
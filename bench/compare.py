@@ -0,0 +1,49 @@
+"""
+Compare two benchmark results files of the same kind:
+
+    python -m bench.compare bench/results/micro-before.json bench/results/micro.json
+
+Prints every numeric metric side by side with the relative change.
+"""
+import argparse
+
+from bench import results
+
+
+def flatten(values, prefix=""):
+    flat = {}
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark results files")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args(argv)
+
+    before, after = results.load(args.before), results.load(args.after)
+    if before['kind'] != after['kind']:
+        raise SystemExit(f"Cannot compare {before['kind']} results with {after['kind']} results")
+    print(f"{before['kind']}: {before.get('git_commit')} ({before['created']}) -> "
+          f"{after.get('git_commit')} ({after['created']})")
+
+    old, new = flatten(before['results']), flatten(after['results'])
+    width = max(len(name) for name in old.keys() | new.keys())
+    for name in sorted(old.keys() | new.keys()):
+        a, b = old.get(name), new.get(name)
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else ""
+        print(f"{name:<{width}}  {_value(a):>12}  {_value(b):>12}  {change:>8}")
+
+
+def _value(value):
+    return "-" if value is None else f"{value:g}"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Local stand-ins for the external services the API depends on:
+
+- a fake NASA POWER daily point endpoint serving realistic payloads, and
+- a stub for google.generativeai.GenerativeModel with configurable latency.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+import zlib
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+POWER_FILL_VALUE = -999.0
+
+
+def power_parameter(latitude, longitude, start, end, fill_rate=0.002):
+    """
+    Build the `parameter` dict of a POWER daily response for start..end
+    (dates): seasonal temperature and humidity for the latitude, gusty
+    wind, surface pressure from a rough elevation and showery
+    precipitation, with the odd fill value like the real service.
+    Deterministic per location and range.
+    """
+    seed = zlib.crc32(f"{latitude:.3f},{longitude:.3f},{start},{end}".encode())
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    n = len(dates)
+    doy = (dates - dates.astype('datetime64[Y]')).astype(int) + 1
+
+    # Southern hemisphere seasons are flipped
+    season = np.cos(2 * np.pi * (doy - 200) / 365.25) * (1 if latitude >= 0 else -1)
+    mean_temp = 28 - 0.45 * abs(latitude)
+    amplitude = 2 + 0.3 * abs(latitude)
+    t2m = mean_temp + amplitude * season + rng.normal(0, 2.5, n)
+    qv2m = np.clip(0.6 * np.exp(0.06 * t2m) + rng.normal(0, 1.0, n), 0.1, None)
+    u10m = np.abs(rng.gamma(2.0, 1.6, n) + 0.8 * season)
+    ps = 101.3 - (abs(longitude) % 7) * 0.8 + rng.normal(0, 0.5, n)
+    wet = rng.random(n) < 0.25 + 0.15 * season
+    prectot = np.where(wet, rng.exponential(6.0, n), 0.0)
+
+    keys = [d.strftime('%Y%m%d') for d in dates.astype(date)]
+    parameter = {}
+    for name, values in (('T2M', t2m), ('QV2M', qv2m), ('U10M', u10m), ('PS', ps), ('PRECTOTCORR', prectot)):
+        values = np.round(values, 2)
+        values[rng.random(n) < fill_rate] = POWER_FILL_VALUE
+        parameter[name] = dict(zip(keys, values.tolist()))
+    return parameter
+
+
+@lru_cache(maxsize=512)
+def power_payload(latitude, longitude, start, end):
+    """Return the encoded JSON body of a POWER daily point response"""
+    start_date = datetime.strptime(start, '%Y%m%d').date()
+    end_date = datetime.strptime(end, '%Y%m%d').date()
+    body = {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [longitude, latitude, 0.0]},
+        'properties': {'parameter': power_parameter(latitude, longitude, start_date, end_date)},
+        'header': {
+            'title': 'NASA/POWER Source Native Resolution Daily Data (bench fake)',
+            'fill_value': POWER_FILL_VALUE,
+            'start': start,
+            'end': end,
+        },
+        'messages': [],
+        'parameters': {},
+        'times': {'data': 0.0, 'process': 0.0},
+    }
+    return json.dumps(body).encode()
+
+
+def create_power_app(latency=0.0):
+    """ASGI app answering like the POWER daily point endpoint, after `latency` seconds"""
+    stats = {'requests': 0}
+
+    async def daily_point(request):
+        stats['requests'] += 1
+        query = request.query_params
+        try:
+            latitude = round(float(query['latitude']), 3)
+            longitude = round(float(query['longitude']), 3)
+            start, end = query['start'], query['end']
+        except (KeyError, ValueError):
+            return JSONResponse({'messages': ['latitude, longitude, start and end are required']}, status_code=422)
+        if latency:
+            await asyncio.sleep(latency)
+        return Response(power_payload(latitude, longitude, start, end), media_type='application/json')
+
+    app = Starlette(routes=[Route('/api/temporal/daily/point', daily_point)])
+    app.state.stats = stats
+    return app
+
+
+def serve_in_thread(app, host='127.0.0.1'):
+    """Run an ASGI app with uvicorn on a free port in a daemon thread; returns (server, base_url)"""
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level='warning', lifespan='off'))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://{host}:{port}"
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Stream:
+    def __init__(self, parts, delay):
+        self._parts = parts
+        self._delay = delay
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for part in self._parts:
+            await asyncio.sleep(self._delay)
+            yield _Response(part)
+
+
+class StubGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel: waits `latency` seconds and returns
+    a canned reply. Streaming spreads the latency over `chunks` parts.
+    """
+    latency = 0.0
+    chunks = 4
+    reply = ("Conditions look suitable for this activity. Expect mild temperatures and a low "
+             "chance of rain; bring water and check the forecast the day before.")
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def _parts(self):
+        size = -(-len(self.reply) // self.chunks)
+        return [self.reply[i:i + size] for i in range(0, len(self.reply), size)]
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        time.sleep(self.latency)
+        return _Response(self.reply)
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        if stream:
+            return _Stream(self._parts(), self.latency / self.chunks)
+        await asyncio.sleep(self.latency)
+        return _Response(self.reply)
+
+
+def install_genai_stub(latency=0.0):
+    """Replace genai.GenerativeModel and genai.configure; call before the app's first LLM call"""
+    import google.generativeai as genai
+
+    StubGenerativeModel.latency = latency
+    genai.GenerativeModel = StubGenerativeModel
+    genai.configure = lambda *args, **kwargs: None
+    return StubGenerativeModel
@@ -0,0 +1,227 @@
+"""
+Concurrent load test of the API against local stand-ins for NASA POWER and Gemini.
+
+    python -m bench.load
+    python -m bench.load --requests 500 --concurrency 32 --llm-latency 1.0
+    python -m bench.load --scenarios json,none --cold --output bench/results/load-cold.json
+
+The API runs in a separate process (bench.serve) with the Gemini stub
+installed, a fake POWER server runs in this process, and each scenario
+(`/analyze` with export=json/csv/none, and `/chat`) gets the same number
+of requests from --concurrency concurrent clients. Reports p50/p95/p99
+latency and requests per second per scenario.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from bench import results
+from bench.fakes import create_power_app, serve_in_thread
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ('json', 'csv', 'none', 'chat')
+ACTIVITIES = ('hiking', 'cycling', 'beach day', 'fishing', 'picnic', 'running', 'camping', 'diving')
+CHAT_MESSAGES = (
+    "Is it a good day for this?",
+    "What should I bring?",
+    "Would the morning be better than the afternoon?",
+    "Suggest an alternative if it rains.",
+)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_locations(count, rng):
+    return [(round(rng.uniform(-45, 60), 3), round(rng.uniform(-120, 140), 3)) for _ in range(count)]
+
+
+def analyze_body(locations, rng, window_days=0):
+    latitude, longitude = rng.choice(locations)
+    future_date = date.today() + timedelta(days=rng.randint(1, 365))
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'future_date': future_date.isoformat(),
+        'activity': rng.choice(ACTIVITIES),
+        'window_days': window_days,
+    }
+
+
+async def wait_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get('/docs')).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise Exception(f"API did not start within {timeout}s")
+
+
+async def run_scenario(client, scenario, n_requests, concurrency, locations, seed, window_days, summary='auto'):
+    """Send n_requests from `concurrency` clients; returns the latency summary"""
+    rng = random.Random(seed)
+    bodies = [analyze_body(locations, rng, window_days) for _ in range(n_requests)]
+    latencies, errors = [], {}
+    next_request = iter(range(n_requests))
+
+    async def worker():
+        session_id = None
+        for i in next_request:
+            body = bodies[i]
+            started = time.perf_counter()
+            try:
+                if scenario == 'chat':
+                    response = await client.post('/chat', json={
+                        'user_message': CHAT_MESSAGES[i % len(CHAT_MESSAGES)],
+                        'activity': body['activity'],
+                        'weather_values': {'temperature': 21.5, 'precipitation_prob': 20},
+                        'session_id': session_id,
+                    })
+                    if response.status_code == 200:
+                        session_id = response.json()['session_id']
+                else:
+                    response = await client.post('/analyze', params={'export': scenario, 'summary': summary}, json=body)
+                elapsed = time.perf_counter() - started
+                if response.status_code != 200:
+                    errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                    continue
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        'requests': n_requests,
+        'ok': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / wall, 2) if wall else None,
+        'wall_s': round(wall, 3),
+        'latency_ms': {
+            'mean': round(sum(ms) / len(ms), 2) if ms else None,
+            'p50': round(results.percentile(ms, 50), 2) if ms else None,
+            'p95': round(results.percentile(ms, 95), 2) if ms else None,
+            'p99': round(results.percentile(ms, 99), 2) if ms else None,
+            'max': round(ms[-1], 2) if ms else None,
+        },
+    }
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    locations = make_locations(args.locations, rng)
+
+    power_app = create_power_app(args.power_latency)
+    power_server, power_url = serve_in_thread(power_app)
+
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        'POWER_BASE_URL': f"{power_url}/api/temporal/daily/point",
+        'POWER_CACHE_DIR': tempfile.mkdtemp(prefix='skyra-bench-'),
+        'SESSION_BACKEND': 'memory',
+        'GOOGLE_API_KEY': env.get('GOOGLE_API_KEY', 'bench'),
+        'PYTHONUNBUFFERED': '1',
+    })
+    if not args.llm_cache:
+        env['LLM_CACHE_TTL'] = '0'
+    api = subprocess.Popen(
+        [sys.executable, '-m', 'bench.serve', '--port', str(port), '--llm-latency', str(args.llm_latency)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL if args.quiet else None,
+    )
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+            await wait_ready(client)
+
+            if not args.cold:
+                print(f"Warming the cache for {len(locations)} locations...")
+                warm_rng = random.Random(args.seed)
+                await asyncio.gather(*[
+                    client.post('/analyze', params={'export': 'none'},
+                                json=dict(analyze_body([location], warm_rng), activity=None))
+                    for location in locations
+                ])
+
+            report = {}
+            for i, scenario in enumerate(args.scenarios):
+                print(f"Running {scenario}: {args.requests} requests, concurrency {args.concurrency}...")
+                report[scenario] = await run_scenario(client, scenario, args.requests, args.concurrency,
+                                                      locations, args.seed + i, args.window_days, args.summary)
+    finally:
+        api.terminate()
+        try:
+            api.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            api.kill()
+        power_server.should_exit = True
+
+    report['_power'] = {'requests': power_app.state.stats['requests']}
+    return report
+
+
+def print_report(report):
+    print(f"\n{'scenario':<10}{'ok':>7}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for scenario, row in report.items():
+        if scenario.startswith('_'):
+            continue
+        latency = row['latency_ms']
+        cells = [latency[key] if latency[key] is not None else float('nan') for key in ('p50', 'p95', 'p99', 'max')]
+        print(f"{scenario:<10}{row['ok']:>7}{sum(row['errors'].values()):>6}{row['rps'] or 0:>10.1f}"
+              + "".join(f"{value:>10.1f}" for value in cells))
+    print(f"\nFake POWER requests: {report['_power']['requests']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test /analyze and /chat against local fakes")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma separated, from {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--requests', type=int, default=200, help="requests per scenario (default: 200)")
+    parser.add_argument('--concurrency', type=int, default=16, help="concurrent clients (default: 16)")
+    parser.add_argument('--locations', type=int, default=10, help="distinct locations requested (default: 10)")
+    parser.add_argument('--window-days', type=int, default=0, help="window_days sent with /analyze")
+    parser.add_argument('--summary', default='auto', choices=('auto', 'inline'),
+                        help="/analyze summary mode; inline always calls the LLM (default: auto)")
+    parser.add_argument('--power-latency', type=float, default=0.3, help="seconds per fake POWER response")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="seconds per stubbed LLM call")
+    parser.add_argument('--llm-cache', action='store_true', help="keep the LLM summary cache enabled")
+    parser.add_argument('--cold', action='store_true', help="skip warming the POWER cache first")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--quiet', action='store_true', help="hide the API's own output")
+    parser.add_argument('--output', help="results file (default: bench/results/load.json)")
+    args = parser.parse_args(argv)
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'quiet')}
+    print(f"Saved {results.save('load', config, report, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Micro-benchmarks of the analysis code on a realistic 10-year POWER payload.
+
+    python -m bench.micro
+    python -m bench.micro --years 20 --filter analyze --output bench/results/micro-20y.json
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import timeit
+from datetime import date
+
+from bench import results
+from bench.fakes import power_parameter, power_payload
+
+
+def timings(func, repeat):
+    """Per-call seconds of `repeat` runs, each long enough to time reliably"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return number, [total / number for total in timer.repeat(repeat=repeat, number=number)]
+
+
+def build_cases(years, latitude, longitude):
+    os.environ.setdefault('POWER_CACHE_DIR', tempfile.mkdtemp(prefix='skyra-bench-'))
+    from app.analyzer import NASAWeatherAnalyzer
+    from app.parser import parse_power_parameter
+    from app.storage import PowerSeries
+
+    analyzer = NASAWeatherAnalyzer()
+    end_year = analyzer.current_year - 1
+    start_year = end_year - years + 1
+    parameter = power_parameter(latitude, longitude, date(start_year, 1, 1), date(end_year, 12, 31))
+    content = power_payload(latitude, longitude, f"{start_year}0101", f"{end_year}1231")
+
+    series = PowerSeries.from_parameter(parameter, start_year, end_year)
+    df = analyzer.process_historical_data(series)
+    index = analyzer.build_climatology_index(series)
+    target = date(analyzer.current_year + 1, 7, 15)
+
+    return {
+        'json_loads': lambda: json.loads(content),
+        'parse_power_parameter': lambda: parse_power_parameter(parameter),
+        'series_from_parameter': lambda: PowerSeries.from_parameter(parameter, start_year, end_year),
+        'process_historical_data[dict]': lambda: analyzer.process_historical_data(parameter),
+        'process_historical_data[series]': lambda: analyzer.process_historical_data(series),
+        'build_climatology_index': lambda: analyzer.build_climatology_index(series),
+        'analyze_future_date[dataframe]': lambda: analyzer.analyze_future_date(df, target),
+        'analyze_future_date[dataframe,window=7]': lambda: analyzer.analyze_future_date(df, target, 7),
+        'analyze_future_date[index]': lambda: analyzer.analyze_future_date(index, target),
+        'analyze_future_date[index,window=7]': lambda: analyzer.analyze_future_date(index, target, 7),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of payload parsing and analysis")
+    parser.add_argument('--years', type=int, default=10, help="years in the payload (default: 10)")
+    parser.add_argument('--latitude', type=float, default=30.0)
+    parser.add_argument('--longitude', type=float, default=31.25)
+    parser.add_argument('--repeat', type=int, default=5, help="timing runs per benchmark (default: 5)")
+    parser.add_argument('--filter', help="only run benchmarks whose name contains this")
+    parser.add_argument('--output', help="results file (default: bench/results/micro.json)")
+    args = parser.parse_args(argv)
+
+    cases = build_cases(args.years, args.latitude, args.longitude)
+    report = {}
+    print(f"{'benchmark':<42}{'loops':>8}{'median':>12}{'min':>12}")
+    for name, func in cases.items():
+        if args.filter and args.filter not in name:
+            continue
+        number, runs = timings(func, args.repeat)
+        report[name] = {
+            'loops': number,
+            'median_us': round(statistics.median(runs) * 1e6, 2),
+            'min_us': round(min(runs) * 1e6, 2),
+        }
+        print(f"{name:<42}{number:>8}{_format(statistics.median(runs)):>12}{_format(min(runs)):>12}")
+
+    config = {key: value for key, value in vars(args).items() if key != 'output'}
+    print(f"Saved {results.save('micro', config, report, args.output)}")
+
+
+def _format(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Run the API with the Gemini stub installed, for bench.load:
+
+    python -m bench.serve --port 8001 --llm-latency 0.8
+
+Point POWER_BASE_URL at a fake POWER server (bench.load does this).
+"""
+import argparse
+
+from bench.fakes import install_genai_stub
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve app.main:app with a stubbed Gemini model")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="seconds per stubbed LLM call")
+    args = parser.parse_args(argv)
+
+    install_genai_stub(args.llm_latency)
+
+    import uvicorn
+    from app.main import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning', access_log=False)
+
+
+if __name__ == '__main__':
+    main()
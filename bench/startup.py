@@ -0,0 +1,111 @@
+"""
+Cold-start check: how long `import app.main` takes in a fresh interpreter,
+measured with `python -X importtime`.
+
+    python -m bench.startup
+    python -m bench.startup --runs 10 --target-ms 600
+
+Exits with status 1 when the median import time is over --target-ms, or
+when one of the modules that should only load on first use (pandas,
+requests, httpx, google.generativeai) is imported at startup. NumPy is
+imported at startup on purpose: module-level tables need it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench import results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_MS = 800
+LAZY_MODULES = ('pandas', 'requests', 'httpx', 'google.generativeai')
+
+
+def _env():
+    env = dict(os.environ)
+    env.update({
+        'POWER_CACHE_DIR': tempfile.mkdtemp(prefix='skyra-bench-'),
+        'SESSION_BACKEND': 'memory',
+        'GOOGLE_API_KEY': env.get('GOOGLE_API_KEY', 'bench'),
+    })
+    return env
+
+
+def parse_importtime(stderr):
+    """Return {module: cumulative microseconds} from -X importtime output"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(total)
+    return cumulative
+
+
+def measure(module, env):
+    """Import module once in a new interpreter; returns (wall seconds, {module: cumulative us})"""
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                             cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if process.returncode != 0:
+        raise Exception(f"import {module} failed:\n{process.stderr[-2000:]}")
+    return wall, parse_importtime(process.stderr)
+
+
+def loaded_lazy_modules(module, env):
+    code = f"import sys, json, {module}; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    process = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise Exception(f"import {module} failed:\n{process.stderr[-2000:]}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import time of the API")
+    parser.add_argument('--module', default='app.main', help="module to import (default: app.main)")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters to time (default: 5)")
+    parser.add_argument('--target-ms', type=float, default=TARGET_MS,
+                        help=f"fail above this median import time (default: {TARGET_MS})")
+    parser.add_argument('--top', type=int, default=10, help="heaviest imports to list (default: 10)")
+    parser.add_argument('--output', help="results file (default: bench/results/startup.json)")
+    args = parser.parse_args(argv)
+
+    env = _env()
+    runs = [measure(args.module, env) for _ in range(args.runs)]
+    import_ms = [modules[args.module] / 1000 for _, modules in runs]
+    wall_ms = [wall * 1000 for wall, _ in runs]
+    median = statistics.median(import_ms)
+
+    # Heaviest modules of the fastest run, nested ones included
+    _, modules = min(runs, key=lambda run: run[1][args.module])
+    heaviest = sorted(((us, name) for name, us in modules.items() if name != args.module), reverse=True)[:args.top]
+    lazy = loaded_lazy_modules(args.module, env)
+
+    print(f"import {args.module}: median {median:.1f} ms, min {min(import_ms):.1f} ms "
+          f"(process wall median {statistics.median(wall_ms):.1f} ms), target {args.target_ms:g} ms")
+    for us, name in heaviest:
+        print(f"  {us / 1000:>8.1f} ms  {name}")
+    if lazy:
+        print(f"Loaded at startup but should load on first use: {', '.join(lazy)}")
+
+    report = {
+        'import_ms': {'median': round(median, 2), 'min': round(min(import_ms), 2), 'max': round(max(import_ms), 2)},
+        'wall_ms': {'median': round(statistics.median(wall_ms), 2)},
+        'heaviest_ms': {name: round(us / 1000, 2) for us, name in heaviest},
+        'lazy_modules_loaded': lazy,
+    }
+    config = {key: value for key, value in vars(args).items() if key != 'output'}
+    print(f"Saved {results.save('startup', config, report, args.output)}")
+
+    if median > args.target_ms or lazy:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# app.utils reads its settings at import time, so keep the tests off the real cache directory
+os.environ.setdefault("POWER_CACHE_DIR", tempfile.mkdtemp(prefix="skyra-tests-"))
+os.environ.setdefault("SESSION_BACKEND", "memory")
@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+
+from app import utils
+from app.analyzer import NASAWeatherAnalyzer
+from app.cache import ClimatologyCache
+from app.storage import PowerSeries
+from bench.fakes import power_parameter
+
+plan_refresh = NASAWeatherAnalyzer._plan_refresh
+
+
+def make_series(start_year, end_year, missing_last_days=0):
+    parameter = power_parameter(30.0, 31.25, date(start_year, 1, 1), date(end_year, 12, 31), fill_rate=0)
+    for values in parameter.values():
+        for key in list(values)[len(values) - missing_last_days:]:
+            values[key] = -999.0
+    return PowerSeries.from_parameter(parameter, start_year, end_year)
+
+
+def test_plan_refresh_without_stored_series():
+    assert plan_refresh(None, 2015, 2024) == (2015, None)
+
+
+def test_plan_refresh_downloads_only_new_years_of_a_shifted_range():
+    fetch_start, base = plan_refresh(make_series(2014, 2023), 2015, 2024)
+    assert fetch_start == 2024
+    assert (base.start_year, base.end_year, base.start_date) == (2015, 2023, date(2015, 1, 1))
+    assert base.n_days == (date(2024, 1, 1) - date(2015, 1, 1)).days
+
+
+def test_plan_refresh_reuses_a_complete_series():
+    fetch_start, base = plan_refresh(make_series(2015, 2024), 2015, 2024)
+    assert fetch_start == 2025
+    assert (base.start_year, base.end_year) == (2015, 2024)
+
+
+def test_plan_refresh_downloads_again_the_year_with_a_trailing_gap():
+    fetch_start, base = plan_refresh(make_series(2015, 2024, missing_last_days=20), 2015, 2024)
+    assert fetch_start == 2024
+    assert (base.start_year, base.end_year) == (2015, 2023)
+    assert not base.has_trailing_gap()
+
+
+def test_plan_refresh_downloads_everything_for_an_earlier_start():
+    assert plan_refresh(make_series(2016, 2024), 2015, 2024) == (2015, None)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ClimatologyCache(str(tmp_path))
+
+
+def test_cache_hit_reads_back_the_series(cache):
+    series = make_series(2015, 2024)
+    cache.put(30.0, 31.25, series)
+    assert cache.get(30.0, 31.25, 2015, 2024).n_days == series.n_days
+    assert cache.get(30.0, 31.25, 2016, 2024) is None
+    assert ClimatologyCache(cache.cache_dir).get(30.0, 31.25, 2015, 2024) is not None
+
+
+def test_cache_hit_with_trailing_gap_goes_stale(cache, monkeypatch):
+    cache.put(30.0, 31.25, make_series(2015, 2024, missing_last_days=20))
+    assert cache.get(30.0, 31.25, 2015, 2024) is not None
+
+    monkeypatch.setattr(utils, "POWER_GAP_REFRESH", 0)
+    assert cache.get(30.0, 31.25, 2015, 2024) is None
+    assert ClimatologyCache(cache.cache_dir).get(30.0, 31.25, 2015, 2024) is None
+
+    cache.put(30.0, 31.25, make_series(2015, 2024))
+    assert cache.get(30.0, 31.25, 2015, 2024) is not None
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.analyzer import NASAWeatherAnalyzer
+from app.storage import PowerSeries
+from bench.fakes import power_parameter
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return NASAWeatherAnalyzer()
+
+
+@pytest.fixture(scope="module")
+def series():
+    return PowerSeries.from_parameter(power_parameter(45.0, 7.5, date(2015, 1, 1), date(2024, 12, 31)), 2015, 2024)
+
+
+def assert_same_stats_every_day(analyzer, series):
+    df = analyzer.process_historical_data(series)
+    index = analyzer.build_climatology_index(series)
+    day = date(2024, 1, 1)  # a leap year, so Feb 29 is covered
+    while day.year == 2024:
+        assert index.stats_for_date(day) == analyzer.analyze_future_date(df, day), day
+        day += timedelta(days=1)
+
+
+def test_index_matches_dataframe_every_day(analyzer, series):
+    assert_same_stats_every_day(analyzer, series)
+
+
+def test_index_matches_dataframe_with_missing_values(analyzer):
+    # Many missing days over a long range: the pandas and the index sums then
+    # add up in different orders, and means on a rounding boundary must still agree
+    parameter = power_parameter(29.2, 20.0, date(1990, 1, 1), date(2024, 12, 31), fill_rate=0.05)
+    series = PowerSeries.from_parameter(parameter, 1990, 2024)
+    assert_same_stats_every_day(analyzer, series)
+
+
+def test_windowed_stats_pool_neighbouring_days(analyzer, series):
+    index = analyzer.build_climatology_index(series)
+    exact = index.stats_for_date(date(2025, 6, 15))
+    pooled = index.stats_for_date(date(2025, 6, 15), window_days=3)
+    assert pooled['sample_size'] == 7 * exact['sample_size']
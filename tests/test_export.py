@@ -0,0 +1,72 @@
+import asyncio
+import io
+import json
+from datetime import date
+
+import numpy as np
+
+from app.analyzer import NASAWeatherAnalyzer
+from app.cache import ClimatologyCache
+from app.export import read_columnar, stream_export
+from app.schemas import WeatherRequest
+from app.storage import PowerSeries
+from bench.fakes import power_parameter
+
+
+def export(analyzer, items, fmt, include_series):
+    async def collect():
+        return [chunk async for chunk in stream_export(analyzer, items, fmt, include_series)]
+    return asyncio.run(collect())
+
+
+def cached_analyzer(tmp_path, points):
+    analyzer = NASAWeatherAnalyzer(cache=ClimatologyCache(str(tmp_path)))
+    start_year, end_year = analyzer.default_years()
+    for latitude, longitude in points:
+        parameter = power_parameter(latitude, longitude, date(start_year, 1, 1), date(end_year, 12, 31))
+        analyzer.cache.put(latitude, longitude, PowerSeries.from_parameter(parameter, start_year, end_year))
+    return analyzer
+
+
+def test_columnar_round_trip(tmp_path):
+    points = [(30.0, 31.25), (-33.5, 18.75)]
+    analyzer = cached_analyzer(tmp_path, points)
+    items = [WeatherRequest(latitude=lat, longitude=lon, future_date=date(2030, 7, 1), window_days=2)
+             for lat, lon in points]
+
+    data = b"".join(export(analyzer, items, 'columnar', include_series=True))
+    frames = list(read_columnar(io.BytesIO(data)))
+
+    assert len(frames) == len(items)
+    for (meta, series), item in zip(frames, items):
+        stored = analyzer.cache.get(item.latitude, item.longitude, *analyzer.default_years())
+        index = analyzer.build_climatology_index(stored)
+        assert meta['location'] == {'latitude': item.latitude, 'longitude': item.longitude}
+        assert meta['error'] is None
+        assert meta['statistics'] == json.loads(json.dumps(index.stats_for_date(item.future_date, 2)))
+        assert series.start_date == stored.start_date
+        assert series.variables == stored.variables
+        assert (series.start_year, series.end_year) == (stored.start_year, stored.end_year)
+        for name in stored.variables:
+            np.testing.assert_array_equal(series.columns[name], stored.columns[name])
+
+
+def test_columnar_without_series(tmp_path):
+    analyzer = cached_analyzer(tmp_path, [(30.0, 31.25)])
+    items = [WeatherRequest(latitude=30.0, longitude=31.25, future_date=date(2030, 1, 15))]
+
+    [(meta, series)] = read_columnar(io.BytesIO(b"".join(export(analyzer, items, 'columnar', include_series=False))))
+    assert series is None
+    assert 'series' not in meta
+    assert meta['statistics']['sample_size'] == 10
+
+
+def test_csv_lists_stats_then_series(tmp_path):
+    analyzer = cached_analyzer(tmp_path, [(30.0, 31.25)])
+    items = [WeatherRequest(latitude=30.0, longitude=31.25, future_date=date(2030, 1, 15))]
+
+    lines = "".join(export(analyzer, items, 'csv', include_series=True)).splitlines()
+    assert lines[0] == "record,latitude,longitude,date,field,value"
+    records = [line.split(",", 1)[0] for line in lines[1:]]
+    assert records == sorted(records, key=lambda record: record != 'stat')
+    assert records.count('series') == analyzer.cache.get(30.0, 31.25, *analyzer.default_years()).n_days * 5
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.gateway import LLMError, LLMGateway, LLMOverloaded, LLMTimeout
+
+
+class ProviderError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Raises the queued errors first, then answers "ok" after delay seconds"""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return Response("ok")
+
+    async def generate_content_async(self, prompt, stream=False):
+        await asyncio.sleep(self.delay)
+        return self._next()
+
+    def generate_content(self, prompt, request_options=None):
+        threading.Event().wait(self.delay)
+        return self._next()
+
+
+def make_gateway(model, **kwargs):
+    options = {'max_concurrency': 1, 'max_queue': 0, 'timeout': 1.0, 'retries': 2, 'backoff': 0.001}
+    gateway = LLMGateway(model_name="test", **{**options, **kwargs})
+    gateway._model = model
+    return gateway
+
+
+def test_transient_errors_are_retried():
+    model = FakeModel([ProviderError(429), ProviderError(503)])
+    assert asyncio.run(make_gateway(model).generate("prompt")) == "ok"
+    assert model.calls == 3
+
+
+def test_gives_up_after_the_retries():
+    model = FakeModel([ProviderError(429)] * 3)
+    with pytest.raises(LLMOverloaded):
+        asyncio.run(make_gateway(model, retries=1).generate("prompt"))
+    assert model.calls == 2
+
+
+def test_other_errors_are_not_retried():
+    model = FakeModel([ProviderError(400)])
+    with pytest.raises(LLMError) as error:
+        asyncio.run(make_gateway(model).generate("prompt"))
+    assert error.type is LLMError
+    assert model.calls == 1
+
+
+def test_deadline_covers_the_call():
+    with pytest.raises(LLMTimeout):
+        asyncio.run(make_gateway(FakeModel(delay=1.0), timeout=0.05).generate("prompt"))
+
+
+def test_sheds_when_the_queue_is_full():
+    gateway = make_gateway(FakeModel(delay=0.1))
+
+    async def both():
+        return await asyncio.gather(gateway.generate("a"), gateway.generate("b"), return_exceptions=True)
+
+    first, second = asyncio.run(both())
+    assert first == "ok"
+    assert isinstance(second, LLMOverloaded)
+    assert second.retry_after is not None
+    assert (gateway.running, gateway.waiting) == (0, 0)
+
+
+def test_sheds_when_no_slot_frees_up_before_the_deadline():
+    gateway = make_gateway(FakeModel(delay=0.2), max_queue=1, timeout=0.1)
+
+    async def both():
+        return await asyncio.gather(gateway.generate("a"), gateway.generate("b"), return_exceptions=True)
+
+    first, second = asyncio.run(both())
+    assert isinstance(first, LLMTimeout)
+    assert isinstance(second, LLMOverloaded)
+
+
+def test_stream_yields_the_chunks():
+    class StreamingModel(FakeModel):
+        async def generate_content_async(self, prompt, stream=False):
+            async def chunks():
+                for text in ("a", "b", "c"):
+                    yield Response(text)
+            return chunks()
+
+    async def collect(gateway):
+        return [chunk async for chunk in gateway.stream("prompt")]
+
+    assert asyncio.run(collect(make_gateway(StreamingModel()))) == ["a", "b", "c"]
+
+
+def test_blocking_calls_are_retried_and_can_run_twice():
+    model = FakeModel([ProviderError(503)])
+    gateway = make_gateway(model)
+    assert gateway.generate_blocking("prompt") == "ok"
+    assert gateway.generate_blocking("prompt") == "ok"
+    assert model.calls == 3
+
+
+def test_blocking_calls_shed_when_the_queue_is_full():
+    gateway = make_gateway(FakeModel(delay=0.2))
+    outcomes = []
+
+    def call():
+        try:
+            outcomes.append(gateway.generate_blocking("prompt"))
+        except LLMError as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert "ok" in outcomes
+    assert any(isinstance(outcome, LLMOverloaded) for outcome in outcomes)
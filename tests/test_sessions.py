@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from app.sessions import MemorySessionStore, SqliteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemorySessionStore(**kwargs)
+        return SqliteSessionStore(str(tmp_path / "sessions.sqlite3"), **kwargs)
+    return make
+
+
+def test_history_keeps_the_last_max_lines(make_store):
+    store = make_store(max_lines=3)
+    session_id = store.get_or_create()
+    store.append(session_id, "a", "b")
+    store.append(session_id, "c", "d", "e")
+    assert store.history(session_id) == ["c", "d", "e"]
+    assert store.history(session_id, limit=2) == ["d", "e"]
+
+
+def test_max_lines_must_be_positive(make_store):
+    with pytest.raises(ValueError):
+        make_store(max_lines=0)
+
+
+def test_session_expires_after_idle_ttl(make_store):
+    store = make_store(idle_ttl=0.05)
+    session_id = store.get_or_create()
+    store.append(session_id, "hello")
+    assert store.touch(session_id)
+
+    time.sleep(0.1)
+    assert not store.touch(session_id)
+    new_id = store.get_or_create(session_id)
+    assert new_id != session_id
+    assert store.history(new_id) == []
+
+
+def test_least_recently_used_sessions_are_evicted(make_store):
+    store = make_store(max_sessions=2)
+    first = store.get_or_create()
+    second = store.get_or_create()
+    store.touch(first)
+    store.get_or_create()
+    assert store.touch(first)
+    assert not store.touch(second)
+
+
+def test_append_to_unknown_session_is_ignored(make_store):
+    store = make_store()
+    store.append("missing", "hello")
+    assert store.history("missing") == []